@@ -0,0 +1,334 @@
+import sys
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from . import models, schemas
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from .auth import get_password_hash_async, user_cache
+from .crud import (
+    _bump_statements, _expired_tokens_delete, _rotate_statement, _rotated_token_user_query,
+    _user_expired_tokens_delete, category_cache, plan_task_batch
+)
+from .metrics import instrument_module
+from fastapi import HTTPException
+
+# Асинхронний варіант crud: кожен запит очікується явно, а зв'язки, потрібні
+# викликачу, завантажуються в тому ж запиті - ліниве завантаження в AsyncSession неможливе
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def get_users(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+) -> List[models.User]:
+    query = select(models.User)
+    if after:
+        query = query.where(models.User.id > after[0])
+    return (await db.scalars(query.order_by(models.User.id).offset(skip).limit(limit))).all()
+
+async def create_user(
+    db: AsyncSession,
+    user: schemas.UserCreate,
+    hashed_password: Optional[str] = None
+) -> models.User:
+    db_user = await get_user_by_username(db, username=user.username)
+    if db_user:
+        raise HTTPException(status_code=400, detail="User with this username already exists")
+
+    if hashed_password is None:
+        hashed_password = await get_password_hash_async(user.password)
+    db_user = models.User(
+        username=user.username,
+        hashed_password=hashed_password,
+        role=user.role
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate) -> models.User:
+    db_user = await get_user(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user.username != db_user.username:
+        existing_user = await get_user_by_username(db, user.username)
+        if existing_user:
+            raise HTTPException(status_code=400, detail="User with this username already exists")
+
+    old_username = db_user.username
+    db_user.username = user.username
+    if user.password:
+        db_user.hashed_password = await get_password_hash_async(user.password)
+    if user.role:
+        db_user.role = user.role
+
+    await db.commit()
+    await db.refresh(db_user)
+    user_cache.invalidate(old_username, db_user.username)
+    return db_user
+
+async def delete_user(db: AsyncSession, user_id: int) -> None:
+    db_user = await get_user(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Видалення всіх завдань і сесій користувача
+    await db.execute(delete(models.Task).where(models.Task.user_id == user_id))
+    await db.execute(delete(models.RefreshToken).where(models.RefreshToken.user_id == user_id))
+
+    username = db_user.username
+    await db.delete(db_user)
+    await db.commit()
+    user_cache.invalidate(username)
+
+async def create_refresh_token(db: AsyncSession, user_id: int, token_hash: str, expires_at: datetime) -> None:
+    db.add(models.RefreshToken(token_hash=token_hash, user_id=user_id, expires_at=expires_at))
+    await db.commit()
+
+async def _bump_versions(db: AsyncSession, *keys: str) -> None:
+    for statement in _bump_statements(db.bind.dialect.name, *keys):
+        await db.execute(statement)
+
+async def rotate_refresh_token(
+    db: AsyncSession,
+    token_hash: str,
+    new_hash: str,
+    expires_at: datetime,
+    grace: float
+) -> Optional[models.User]:
+    """
+    Замінює дійсний refresh-токен новим в одній транзакції і повертає його власника.
+    Вже ротований або прострочений токен дає None (див. get_rotated_token_user)
+    """
+    user_id = await db.scalar(_rotate_statement(token_hash, grace))
+    if user_id is None:
+        await db.rollback()
+        return None
+    await db.execute(_user_expired_tokens_delete(user_id))
+    db.add(models.RefreshToken(token_hash=new_hash, user_id=user_id, expires_at=expires_at))
+    await db.commit()
+    return await get_user(db, user_id)
+
+async def get_rotated_token_user(db: AsyncSession, token_hash: str) -> Optional[models.User]:
+    """Власник токена, ротованого іншим запитом менш ніж grace секунд тому"""
+    return await db.scalar(_rotated_token_user_query(token_hash))
+
+async def delete_refresh_token(db: AsyncSession, token_hash: str) -> None:
+    await db.execute(_expired_tokens_delete(token_hash))
+    await db.commit()
+
+async def get_data_versions(db: AsyncSession, *keys: str) -> Dict[str, int]:
+    """Спільні для всіх процесів версії даних за ключами; ключ без змін має версію 0"""
+    versions = dict((await db.execute(
+        select(models.DataVersion.key, models.DataVersion.version).where(models.DataVersion.key.in_(keys))
+    )).all())
+    return {key: versions.get(key, 0) for key in keys}
+
+async def get_category(db: AsyncSession, category_id: int) -> Optional[models.Category]:
+    return await db.scalar(select(models.Category).where(models.Category.id == category_id))
+
+async def get_category_by_name(db: AsyncSession, name: str) -> Optional[models.Category]:
+    return await db.scalar(select(models.Category).where(models.Category.name == name))
+
+async def _get_category_snapshot(db: AsyncSession) -> dict:
+    snapshot = category_cache.get()
+    if snapshot is not None:
+        return snapshot
+    version = category_cache.version
+    categories = (await db.scalars(select(models.Category).order_by(models.Category.id))).all()
+    # Від'єднуємо об'єкти від сесії, щоб їх можна було віддавати в інших запитах
+    for category in categories:
+        db.expunge(category)
+    snapshot = {
+        "list": categories,
+        "names": {category.id: category.name for category in categories}
+    }
+    category_cache.set(snapshot, version)
+    return snapshot
+
+async def get_categories(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Category]:
+    return (await _get_category_snapshot(db))["list"][skip:skip + limit]
+
+async def category_exists(db: AsyncSession, category_id: int) -> bool:
+    return category_id in (await _get_category_snapshot(db))["names"]
+
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate) -> models.Category:
+    db_category = await get_category_by_name(db, name=category.name)
+    if db_category:
+        raise HTTPException(status_code=400, detail="Category with this name already exists")
+
+    db_category = models.Category(name=category.name)
+    db.add(db_category)
+    await _bump_versions(db, models.DataVersion.CATEGORIES)
+    await db.commit()
+    await db.refresh(db_category)
+    category_cache.bump()
+    return db_category
+
+async def update_category(db: AsyncSession, category_id: int, category: schemas.CategoryUpdate) -> models.Category:
+    db_category = await get_category(db, category_id)
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # Перевірка чи нова назва вже зайнята
+    if category.name != db_category.name:
+        existing_category = await get_category_by_name(db, category.name)
+        if existing_category:
+            raise HTTPException(status_code=400, detail="Category with this name already exists")
+
+    db_category.name = category.name
+    await _bump_versions(db, models.DataVersion.CATEGORIES)
+    await db.commit()
+    await db.refresh(db_category)
+    category_cache.bump()
+    return db_category
+
+async def delete_category(db: AsyncSession, category_id: int) -> None:
+    db_category = await get_category(db, category_id)
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # Видалення всіх завдань у цій категорії
+    await db.execute(delete(models.Task).where(models.Task.category_id == category_id))
+
+    await db.delete(db_category)
+    await _bump_versions(db, models.DataVersion.CATEGORIES)
+    await db.commit()
+    category_cache.bump()
+
+def _tasks_query():
+    # Категорія потрібна кожному рядку списку та схемі Task: завантажується тим самим запитом (JOIN)
+    return select(models.Task).options(joinedload(models.Task.category))
+
+async def _load_category(db: AsyncSession, db_task: models.Task) -> None:
+    # Після commit зв'язок може вказувати на стару категорію, а лінивого завантаження немає
+    await db.refresh(db_task, attribute_names=["category"])
+
+async def get_task(db: AsyncSession, task_id: int) -> Optional[models.Task]:
+    return await db.scalar(_tasks_query().where(models.Task.id == task_id))
+
+async def get_tasks(
+    db: AsyncSession,
+    user_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None
+) -> List[models.Task]:
+    # Keyset-пагінація: after - ключ (id,) останнього завдання попередньої сторінки
+    query = _tasks_query().where(models.Task.user_id == user_id)
+    if after:
+        query = query.where(models.Task.id > after[0])
+    query = query.order_by(models.Task.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return (await db.scalars(query)).all()
+
+async def iter_tasks(db: AsyncSession, user_id: int, batch_size: int = 100) -> AsyncIterator[models.Task]:
+    # Потокове читання завдань пачками по batch_size (серверний курсор).
+    # ORM обробляє пачку в циклі подій без перерв, тому вона менша, ніж у crud:
+    # інші запити не чекають на розбір сотень рядків
+    result = await db.stream_scalars(
+        _tasks_query()
+        .where(models.Task.user_id == user_id)
+        .order_by(models.Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for task in result:
+        yield task
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate, user_id: int) -> models.Task:
+    if not await category_exists(db, task.category_id):
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    db_task = models.Task(
+        **task.model_dump(),
+        user_id=user_id
+    )
+    db.add(db_task)
+    await _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    await db.commit()
+    await _load_category(db, db_task)
+    return db_task
+
+async def update_task(db: AsyncSession, task_id: int, task: schemas.TaskUpdate, user_id: int) -> models.Task:
+    db_task = await get_task(db, task_id)
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if db_task.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    # Перевірка чи існує категорія
+    category_changed = task.category_id != db_task.category_id
+    if category_changed:
+        if not await category_exists(db, task.category_id):
+            raise HTTPException(status_code=404, detail="Category not found")
+
+    for key, value in task.model_dump(exclude_unset=True).items():
+        setattr(db_task, key, value)
+
+    await _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    await db.commit()
+    if category_changed:
+        await _load_category(db, db_task)
+    return db_task
+
+async def delete_task(db: AsyncSession, task_id: int, user_id: int) -> None:
+    db_task = await get_task(db, task_id)
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if db_task.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    await db.delete(db_task)
+    await _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    await db.commit()
+
+async def batch_tasks(db: AsyncSession, user_id: int, operations: List[schemas.TaskBatchOperation]) -> List[Dict]:
+    """
+    Виконує пакет операцій над завданнями в одній транзакції через
+    масові INSERT/UPDATE/DELETE замість окремих запитів на кожне завдання
+    """
+    ids = [operation.id for operation in operations if operation.op != "create" and operation.id is not None]
+    owned = set()
+    if ids:
+        owned = set(await db.scalars(
+            select(models.Task.id)
+            .where(models.Task.user_id == user_id, models.Task.id.in_(ids))
+            .with_for_update()
+        ))
+    category_ids = (await _get_category_snapshot(db))["names"]
+    results, creates, updates, deletes = plan_task_batch(operations, owned, category_ids)
+
+    if deletes:
+        await db.execute(
+            delete(models.Task)
+            .where(models.Task.user_id == user_id, models.Task.id.in_([task_id for _, task_id in deletes]))
+        )
+    if updates:
+        # ORM-оновлення за первинним ключем: executemany, згрупований за набором полів
+        await db.execute(update(models.Task), [{"id": task_id, **patch} for _, task_id, patch in updates])
+    if creates:
+        created_ids = (await db.scalars(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            [{**data, "user_id": user_id} for _, data in creates]
+        )).all()
+        for (index, _), task_id in zip(creates, created_ids):
+            results[index]["id"] = task_id
+    if creates or updates or deletes:
+        await _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    await db.commit()
+    return results
+
+
+# Час виклику та SQL-запити кожної функції модуля йдуть у метрики
+instrument_module(sys.modules[__name__])
@@ -0,0 +1,70 @@
+import time
+from typing import AsyncIterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from .config import settings
+from .database import _is_memory_sqlite, _set_sqlite_pragmas, engine_options, instrument_engine
+from .metrics import observe_acquire
+
+# Асинхронні драйвери для СУБД з DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Асинхронний пул з'єднань, що записує час отримання з'єднання в метрики"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_acquire("async", started)
+
+
+def async_database_url(database_url: str) -> URL:
+    """DATABASE_URL з асинхронним драйвером (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg)"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError("No async driver for database backend: %s" % backend)
+    return url.set(drivername="%s+%s" % (backend, ASYNC_DRIVERS[backend]))
+
+
+def create_async_db_engine(database_url: str) -> AsyncEngine:
+    url = async_database_url(database_url)
+    engine = create_async_engine(url, **engine_options(url, poolclass=TimedAsyncQueuePool))
+    # Події рушія працюють через синхронний фасад AsyncEngine
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Фабрика асинхронних сесій; рушій створюється при першому зверненні"""
+    global _engine, _sessionmaker
+    if _sessionmaker is None:
+        _engine = create_async_db_engine(settings.DATABASE_URL)
+        # Після commit атрибути не прострочуються: їх повторне читання
+        # було б неявним запитом, а неявні запити в асинхронній сесії неможливі
+        _sessionmaker = async_sessionmaker(_engine, autoflush=False, expire_on_commit=False)
+    return _sessionmaker
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """Закриття з'єднань асинхронного рушія (викликається при зупинці застосунку)"""
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _sessionmaker = None
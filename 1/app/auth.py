@@ -1,63 +1,266 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Set
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Cookie
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from . import models, schemas
-from .database import get_db
+from .async_database import get_async_db, get_async_sessionmaker
+from .database import SessionLocal, get_db
+from .cache import TTLCache
 from .config import settings
+from .metrics import PASSWORD_HASH_LATENCY, PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WAIT, PASSWORD_REHASHES
 
 # Налаштування для хешування паролів
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Кеш користувачів за іменем (sub з токена), щоб не звертатися до БД на кожен запит
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
-    user = db.query(models.User).filter(models.User.username == username).first()
-    if not user or not verify_password(password, user.hashed_password):
+def configure_password_hash(rounds: Optional[int]) -> None:
+    """Вартість bcrypt для нових хешів; хеші з меншою вартістю перехешовуються при вході"""
+    if rounds is not None:
+        pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_desired_rounds=rounds)
+
+def _time_password_hash(rounds: int, repeat: int = 3) -> float:
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        handler.hash("calibration")
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def calibrate_password_hash(target_ms: float, min_rounds: int) -> int:
+    """
+    Найбільша вартість bcrypt, за якої хешування на цій машині триває
+    не довше target_ms, але не менша за min_rounds
+    """
+    rounds = min_rounds
+    elapsed_ms = _time_password_hash(rounds) * 1000
+    max_rounds = pwd_context.handler("bcrypt").max_rounds
+    # Кожен додатковий раунд подвоює час хешування
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    return rounds
+
+# Пул процесів для bcrypt: хешування не блокує цикл подій і використовує всі ядра
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_CONCURRENCY)
+_hash_stats = {"active": 0, "waiting": 0, "completed": 0, "rehashed": 0, "rehash_failed": 0}
+# Вартість bcrypt після setup_password_hasher (None - типова вартість passlib)
+_hash_rounds: Optional[int] = None
+_rehash_tasks: Set[asyncio.Task] = set()
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            initializer=configure_password_hash,
+            initargs=(_hash_rounds,)
+        )
+    return _hash_executor
+
+def setup_password_hasher() -> int:
+    """Калібрування вартості bcrypt при старті процесу"""
+    global _hash_rounds
+    rounds = settings.PASSWORD_HASH_ROUNDS or calibrate_password_hash(
+        settings.PASSWORD_HASH_TARGET_MS, settings.PASSWORD_HASH_MIN_ROUNDS
+    )
+    rounds = max(rounds, settings.PASSWORD_HASH_MIN_ROUNDS)
+    configure_password_hash(rounds)
+    _hash_rounds = rounds
+    PASSWORD_HASH_ROUNDS.set(rounds)
+    # Процеси пулу отримують налаштування при запуску, тож уже запущені перезапускаються
+    shutdown_password_hasher()
+    return rounds
+
+async def _run_in_hash_pool(func, *args):
+    started = time.perf_counter()
+    _hash_stats["waiting"] += 1
+    try:
+        await _hash_semaphore.acquire()
+    finally:
+        _hash_stats["waiting"] -= 1
+    PASSWORD_HASH_WAIT.observe(time.perf_counter() - started)
+    _hash_stats["active"] += 1
+    started = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        PASSWORD_HASH_LATENCY.labels(func.__name__).observe(time.perf_counter() - started)
+        _hash_stats["active"] -= 1
+        _hash_stats["completed"] += 1
+        _hash_semaphore.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def _rehash_password(username: str, user_id: int, old_hash: str, password: str, store) -> None:
+    new_hash = await get_password_hash_async(password)
+    if await store(user_id, old_hash, new_hash):
+        _hash_stats["rehashed"] += 1
+        PASSWORD_REHASHES.inc()
+        user_cache.invalidate(username)
+
+def _rehash_done(task: asyncio.Task) -> None:
+    _rehash_tasks.discard(task)
+    # Невдале перехешування не впливає на вхід: хеш оновиться при наступному
+    if not task.cancelled() and task.exception() is not None:
+        _hash_stats["rehash_failed"] += 1
+
+def _schedule_rehash(username: str, user_id: int, old_hash: str, password: str, store) -> None:
+    """
+    Перехешування пароля з поточною вартістю bcrypt після успішного входу.
+    Виконується у фоні, тож відповідь на вхід не чекає на ще одне хешування
+    """
+    task = asyncio.create_task(_rehash_password(username, user_id, old_hash, password, store))
+    _rehash_tasks.add(task)
+    task.add_done_callback(_rehash_done)
+
+def get_password_hash_stats() -> Dict:
+    """Стан пулу bcrypt: зайняті слоти, глибина черги та кількість виконаних операцій"""
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "concurrency": settings.PASSWORD_HASH_CONCURRENCY,
+        "rounds": _hash_rounds,
+        **_hash_stats
+    }
+
+def shutdown_password_hasher() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+def _get_user_by_username(db: Session, username: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def _password_hash_update(user_id: int, old_hash: str, new_hash: str):
+    # Умова на старий хеш: пароль, змінений за цей час, не перезаписується
+    return (
+        update(models.User)
+        .where(models.User.id == user_id, models.User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+    )
+
+def _store_password_hash(user_id: int, old_hash: str, new_hash: str) -> bool:
+    with SessionLocal() as db:
+        updated = db.execute(_password_hash_update(user_id, old_hash, new_hash)).rowcount
+        db.commit()
+    return updated > 0
+
+async def _store_password_hash_async(user_id: int, old_hash: str, new_hash: str) -> bool:
+    async with get_async_sessionmaker()() as db:
+        updated = (await db.execute(_password_hash_update(user_id, old_hash, new_hash))).rowcount
+        await db.commit()
+    return updated > 0
+
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
+    user = await run_in_threadpool(_get_user_by_username, db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
+        return None
+    if pwd_context.needs_update(user.hashed_password):
+        _schedule_rehash(
+            user.username, user.id, user.hashed_password, password,
+            functools.partial(run_in_threadpool, _store_password_hash)
+        )
+    return user
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[models.User]:
+    user = await db.scalar(select(models.User).where(models.User.username == username))
+    if not user or not await verify_password_async(password, user.hashed_password):
         return None
+    if pwd_context.needs_update(user.hashed_password):
+        _schedule_rehash(user.username, user.id, user.hashed_password, password, _store_password_hash_async)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    access_token: str = Cookie(None, alias="access_token"),
-    db: Session = Depends(get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _token_username(access_token: Optional[str]) -> str:
     if not access_token:
-        raise credentials_exception
+        raise _credentials_exception()
         
     try:
         token = access_token.replace("Bearer ", "")
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.username == username).first()
+        raise _credentials_exception()
+    return username
+
+def _load_user(db: Session, username: str) -> Optional[models.User]:
+    user = _get_user_by_username(db, username)
+    if user is not None:
+        # Від'єднуємо об'єкт від сесії, щоб commit у запиті не скинув його атрибути
+        db.expunge(user)
+    return user
+
+async def get_current_user(
+    access_token: str = Cookie(None, alias="access_token"),
+    db: Session = Depends(get_db)
+) -> models.User:
+    username = _token_username(access_token)
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+
+    user = await run_in_threadpool(_load_user, db, username)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.set(username, user)
+    return user
+
+async def get_current_user_async(
+    access_token: str = Cookie(None, alias="access_token"),
+    db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """Варіант get_current_user для асинхронної сесії SQLAlchemy (DB_ASYNC)"""
+    username = _token_username(access_token)
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+
+    user = await db.scalar(select(models.User).where(models.User.username == username))
+    if user is None:
+        raise _credentials_exception()
+    db.expunge(user)
+    user_cache.set(username, user)
     return user
 
 async def get_current_user_optional(
@@ -67,4 +270,13 @@ async def get_current_user_optional(
     try:
         return await get_current_user(access_token, db)
     except HTTPException:
-        return None 
\ No newline at end of file
+        return None
+
+async def get_current_user_optional_async(
+    db: AsyncSession = Depends(get_async_db),
+    access_token: str = Cookie(None, alias="access_token")
+) -> Optional[models.User]:
+    try:
+        return await get_current_user_async(access_token, db)
+    except HTTPException:
+        return None
@@ -7,12 +7,65 @@ load_dotenv()
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Асинхронна сесія SQLAlchemy (aiosqlite / asyncpg) замість синхронної
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    # Від'ємне значення - розмір у КіБ (64 МіБ на з'єднання)
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024))
     
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+    # Сесія подовжується refresh-токеном без повторного введення пароля
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+    # Access-токен перевидається, коли до закінчення його дії лишається менше цього часу
+    ACCESS_TOKEN_RENEW_MINUTES: int = int(os.getenv("ACCESS_TOKEN_RENEW_MINUTES", 5))
+    # Щойно ротований refresh-токен ще стільки секунд дає access-токен паралельним запитам
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: float = float(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 60))
+    CATEGORY_CACHE_TTL: float = float(os.getenv("CATEGORY_CACHE_TTL", 300))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    PASSWORD_HASH_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_CONCURRENCY", os.cpu_count() or 1))
+    # Вартість bcrypt підбирається при старті під цільовий час хешування на цій машині;
+    # PASSWORD_HASH_ROUNDS > 0 задає її явно. Нижче PASSWORD_HASH_MIN_ROUNDS вона не опускається
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", 250))
+    PASSWORD_HASH_MIN_ROUNDS: int = int(os.getenv("PASSWORD_HASH_MIN_ROUNDS", 10))
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", 0))
+    # Спроби входу за IP та за іменем користувача (token bucket); кожна коштує перевірку bcrypt
+    LOGIN_RATE_LIMIT: bool = os.getenv("LOGIN_RATE_LIMIT", "true").lower() == "true"
+    LOGIN_IP_PER_MINUTE: float = float(os.getenv("LOGIN_IP_PER_MINUTE", 30))
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", 10))
+    LOGIN_USERNAME_PER_MINUTE: float = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", 10))
+    LOGIN_USERNAME_BURST: int = int(os.getenv("LOGIN_USERNAME_BURST", 5))
+    LOGIN_LIMIT_KEYS: int = int(os.getenv("LOGIN_LIMIT_KEYS", 10000))
+    # Одночасні спроби входу в процесі; понад ліміт - одразу 429 замість черги до bcrypt
+    LOGIN_CONCURRENCY: int = int(os.getenv("LOGIN_CONCURRENCY", 4 * (os.cpu_count() or 1)))
+
+    TASKS_PAGE_SIZE: int = int(os.getenv("TASKS_PAGE_SIZE", 50))
+    TASKS_PAGE_SIZE_MAX: int = int(os.getenv("TASKS_PAGE_SIZE_MAX", 500))
+    TASKS_BATCH_MAX: int = int(os.getenv("TASKS_BATCH_MAX", 1000))
     
     DEBUG: bool = os.getenv("DEBUG")
+    TEMPLATE_CACHE_DIR: str = os.getenv("TEMPLATE_CACHE_DIR", ".template_cache")
+    STATIC_BUILD_DIR: str = os.getenv("STATIC_BUILD_DIR", ".static_build")
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    # Адреси та мережі, яким доступний /metrics ("*" - усім)
+    METRICS_ALLOWED_HOSTS: str = os.getenv("METRICS_ALLOWED_HOSTS", "127.0.0.1,::1")
+    COMPRESSION_CONTENT_TYPES: str = os.getenv(
+        "COMPRESSION_CONTENT_TYPES",
+        "text/html,text/plain,text/css,text/csv,application/json,application/javascript,application/x-ndjson"
+    )
     HOST: str = os.getenv("HOST")
     PORT: int = int(os.getenv("PORT"))
     
@@ -1,10 +1,19 @@
-from sqlalchemy.orm import Session
+import sys
+from sqlalchemy import case, delete, exists, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload
 from . import models, schemas
-from typing import List, Optional
-from datetime import date, datetime
-from .auth import get_password_hash
+from typing import Collection, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from .auth import get_password_hash, user_cache
+from .cache import VersionedCache
+from .config import settings
+from .metrics import instrument_module
 from fastapi import HTTPException, status
 
+# Кеш списку категорій: версія збільшується при кожній зміні категорій
+category_cache = VersionedCache(ttl=settings.CATEGORY_CACHE_TTL)
+
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
 
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -12,15 +21,29 @@ def get_user(db: Session, user_id: int) -> Optional[models.User]:
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+) -> List[models.User]:
+    query = db.query(models.User)
+    if after:
+        query = query.filter(models.User.id > after[0])
+    return query.order_by(models.User.id).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
+def create_user(
+    db: Session,
+    user: schemas.UserCreate,
+    hashed_password: Optional[str] = None
+) -> models.User:
     db_user = get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="User with this username already exists")
     
-    hashed_password = get_password_hash(user.password)
+    # Роутери передають хеш, обчислений у пулі процесів; скрипти хешують тут
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         hashed_password=hashed_password,
@@ -41,6 +64,7 @@ def update_user(db: Session, user_id: int, user: schemas.UserUpdate) -> models.U
         if existing_user:
             raise HTTPException(status_code=400, detail="User with this username already exists")
     
+    old_username = db_user.username
     db_user.username = user.username
     if user.password:
         db_user.hashed_password = get_password_hash(user.password)
@@ -49,6 +73,7 @@ def update_user(db: Session, user_id: int, user: schemas.UserUpdate) -> models.U
     
     db.commit()
     db.refresh(db_user)
+    user_cache.invalidate(old_username, db_user.username)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> None:
@@ -56,11 +81,124 @@ def delete_user(db: Session, user_id: int) -> None:
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Видалення всіх завдань користувача
+    # Видалення всіх завдань і сесій користувача
     db.query(models.Task).filter(models.Task.user_id == user_id).delete()
+    db.query(models.RefreshToken).filter(models.RefreshToken.user_id == user_id).delete()
     
+    username = db_user.username
     db.delete(db_user)
     db.commit()
+    user_cache.invalidate(username)
+
+def create_refresh_token(db: Session, user_id: int, token_hash: str, expires_at: datetime) -> None:
+    db.add(models.RefreshToken(token_hash=token_hash, user_id=user_id, expires_at=expires_at))
+    db.commit()
+
+# INSERT ... ON CONFLICT для СУБД, які його підтримують
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _bump_statements(dialect_name: str, *keys: str) -> list:
+    """Оператори збільшення версій ключів (відсутній ключ створюється з версією 1)"""
+    keys = sorted(keys)
+    version = models.DataVersion
+    upsert = _UPSERTS.get(dialect_name)
+    if upsert is not None:
+        statement = upsert(version).values([{"key": key, "version": 1} for key in keys])
+        return [statement.on_conflict_do_update(index_elements=[version.key], set_={"version": version.version + 1})]
+    # Інші СУБД: збільшуємо наявні ключі, потім вставляємо відсутні
+    statements = [update(version).where(version.key.in_(keys)).values(version=version.version + 1)]
+    for key in keys:
+        statements.append(insert(version).from_select(
+            ["key", "version"],
+            select(literal(key), literal(1)).where(~exists().where(version.key == key))
+        ))
+    return statements
+
+def _bump_versions(db: Session, *keys: str) -> None:
+    for statement in _bump_statements(db.bind.dialect.name, *keys):
+        db.execute(statement)
+
+def _rotate_statement(token_hash: str, grace: float):
+    # Токен позначається ротованим і діє ще grace секунд (але не довше власного строку)
+    now = datetime.utcnow()
+    grace_until = now + timedelta(seconds=grace)
+    return (
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.rotated_at.is_(None),
+            models.RefreshToken.expires_at > now
+        )
+        .values(
+            rotated_at=now,
+            expires_at=case(
+                (models.RefreshToken.expires_at < grace_until, models.RefreshToken.expires_at),
+                else_=grace_until
+            )
+        )
+        .returning(models.RefreshToken.user_id)
+    )
+
+def _rotated_token_user_query(token_hash: str):
+    return (
+        select(models.User)
+        .join(models.RefreshToken, models.RefreshToken.user_id == models.User.id)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.rotated_at.is_not(None),
+            models.RefreshToken.expires_at > datetime.utcnow()
+        )
+    )
+
+def _expired_tokens_delete(token_hash: str):
+    # Заодно прибираються прострочені токени всіх користувачів
+    return delete(models.RefreshToken).where(
+        (models.RefreshToken.token_hash == token_hash) | (models.RefreshToken.expires_at <= datetime.utcnow())
+    )
+
+def _user_expired_tokens_delete(user_id: int):
+    # Прострочені та давно ротовані токени користувача (ротованим expires_at скорочено до grace)
+    return delete(models.RefreshToken).where(
+        models.RefreshToken.user_id == user_id, models.RefreshToken.expires_at <= datetime.utcnow()
+    )
+
+def rotate_refresh_token(
+    db: Session,
+    token_hash: str,
+    new_hash: str,
+    expires_at: datetime,
+    grace: float
+) -> Optional[models.User]:
+    """
+    Замінює дійсний refresh-токен новим в одній транзакції і повертає його власника.
+    Вже ротований або прострочений токен дає None (див. get_rotated_token_user)
+    """
+    user_id = db.scalar(_rotate_statement(token_hash, grace))
+    if user_id is None:
+        db.rollback()
+        return None
+    db.execute(_user_expired_tokens_delete(user_id))
+    db.add(models.RefreshToken(token_hash=new_hash, user_id=user_id, expires_at=expires_at))
+    db.commit()
+    return get_user(db, user_id)
+
+def get_rotated_token_user(db: Session, token_hash: str) -> Optional[models.User]:
+    """
+    Власник токена, ротованого іншим запитом менш ніж grace секунд тому.
+    Окремий запит після відкату: він уже бачить ротацію, на яку чекав rotate_refresh_token
+    """
+    return db.scalar(_rotated_token_user_query(token_hash))
+
+def delete_refresh_token(db: Session, token_hash: str) -> None:
+    db.execute(_expired_tokens_delete(token_hash))
+    db.commit()
+
+def get_data_versions(db: Session, *keys: str) -> Dict[str, int]:
+    """Спільні для всіх процесів версії даних за ключами; ключ без змін має версію 0"""
+    versions = dict(db.execute(
+        select(models.DataVersion.key, models.DataVersion.version).where(models.DataVersion.key.in_(keys))
+    ).all())
+    return {key: versions.get(key, 0) for key in keys}
 
 def get_category(db: Session, category_id: int) -> Optional[models.Category]:
     return db.query(models.Category).filter(models.Category.id == category_id).first()
@@ -68,8 +206,27 @@ def get_category(db: Session, category_id: int) -> Optional[models.Category]:
 def get_category_by_name(db: Session, name: str) -> Optional[models.Category]:
     return db.query(models.Category).filter(models.Category.name == name).first()
 
+def _get_category_snapshot(db: Session) -> dict:
+    snapshot = category_cache.get()
+    if snapshot is not None:
+        return snapshot
+    version = category_cache.version
+    categories = db.query(models.Category).order_by(models.Category.id).all()
+    # Від'єднуємо об'єкти від сесії, щоб їх можна було віддавати в інших запитах
+    for category in categories:
+        db.expunge(category)
+    snapshot = {
+        "list": categories,
+        "names": {category.id: category.name for category in categories}
+    }
+    category_cache.set(snapshot, version)
+    return snapshot
+
 def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[models.Category]:
-    return db.query(models.Category).offset(skip).limit(limit).all()
+    return _get_category_snapshot(db)["list"][skip:skip + limit]
+
+def category_exists(db: Session, category_id: int) -> bool:
+    return category_id in _get_category_snapshot(db)["names"]
 
 def create_category(db: Session, category: schemas.CategoryCreate) -> models.Category:
     db_category = get_category_by_name(db, name=category.name)
@@ -78,8 +235,10 @@ def create_category(db: Session, category: schemas.CategoryCreate) -> models.Cat
     
     db_category = models.Category(name=category.name)
     db.add(db_category)
+    _bump_versions(db, models.DataVersion.CATEGORIES)
     db.commit()
     db.refresh(db_category)
+    category_cache.bump()
     return db_category
 
 def update_category(db: Session, category_id: int, category: schemas.CategoryUpdate) -> models.Category:
@@ -94,8 +253,10 @@ def update_category(db: Session, category_id: int, category: schemas.CategoryUpd
             raise HTTPException(status_code=400, detail="Category with this name already exists")
     
     db_category.name = category.name
+    _bump_versions(db, models.DataVersion.CATEGORIES)
     db.commit()
     db.refresh(db_category)
+    category_cache.bump()
     return db_category
 
 def delete_category(db: Session, category_id: int) -> None:
@@ -107,20 +268,44 @@ def delete_category(db: Session, category_id: int) -> None:
     db.query(models.Task).filter(models.Task.category_id == category_id).delete()
     
     db.delete(db_category)
+    _bump_versions(db, models.DataVersion.CATEGORIES)
     db.commit()
+    category_cache.bump()
+
+def _tasks_query(db: Session):
+    # Категорія потрібна кожному рядку списку та схемі Task:
+    # завантажується тим самим запитом (JOIN), а не окремим SELECT на кожне завдання
+    return db.query(models.Task).options(joinedload(models.Task.category))
 
 def get_task(db: Session, task_id: int) -> Optional[models.Task]:
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+    return _tasks_query(db).filter(models.Task.id == task_id).first()
 
 def get_tasks(
     db: Session,
     user_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None
 ) -> List[models.Task]:
-    return db.query(models.Task).filter(models.Task.user_id == user_id).all()
+    # Keyset-пагінація: after - ключ (id,) останнього завдання попередньої сторінки
+    query = _tasks_query(db).filter(models.Task.user_id == user_id)
+    if after:
+        query = query.filter(models.Task.id > after[0])
+    query = query.order_by(models.Task.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def iter_tasks(db: Session, user_id: int, batch_size: int = 500):
+    # Потокове читання завдань пачками по batch_size (серверний курсор)
+    return (
+        _tasks_query(db)
+        .filter(models.Task.user_id == user_id)
+        .order_by(models.Task.id)
+        .yield_per(batch_size)
+    )
 
 def create_task(db: Session, task: schemas.TaskCreate, user_id: int) -> models.Task:
-    category = get_category(db, task.category_id)
-    if not category:
+    if not category_exists(db, task.category_id):
         raise HTTPException(status_code=404, detail="Category not found")
     
     db_task = models.Task(
@@ -128,6 +313,7 @@ def create_task(db: Session, task: schemas.TaskCreate, user_id: int) -> models.T
         user_id=user_id
     )
     db.add(db_task)
+    _bump_versions(db, models.DataVersion.tasks_key(user_id))
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -142,13 +328,13 @@ def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: in
     
     # Перевірка чи існує категорія
     if task.category_id != db_task.category_id:
-        category = get_category(db, task.category_id)
-        if not category:
+        if not category_exists(db, task.category_id):
             raise HTTPException(status_code=404, detail="Category not found")
     
     for key, value in task.dict(exclude_unset=True).items():
         setattr(db_task, key, value)
     
+    _bump_versions(db, models.DataVersion.tasks_key(user_id))
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -162,4 +348,104 @@ def delete_task(db: Session, task_id: int, user_id: int) -> None:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     db.delete(db_task)
-    db.commit() 
\ No newline at end of file
+    _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    db.commit()
+
+# Поля, які не можна обнулити при оновленні
+_REQUIRED_TASK_FIELDS = ("title", "category_id", "status", "priority")
+
+def plan_task_batch(
+    operations: List[schemas.TaskBatchOperation],
+    owned_ids: Collection[int],
+    category_ids: Collection[int]
+) -> Tuple[List[Dict], List[Tuple[int, Dict]], List[Tuple[int, int, Dict]], List[Tuple[int, int]]]:
+    """
+    Перевіряє операції пакета без звернень до БД (власність завдань і категорії
+    вже завантажені). Повертає результати всіх операцій та коректні
+    створення (index, дані), оновлення (index, id, patch) і видалення (index, id)
+    """
+    results, creates, updates, deletes = [], [], [], []
+    seen = set()
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation.op, "status": None, "id": operation.id, "error": None}
+        results.append(result)
+        data = operation.task.model_dump(exclude_unset=True) if operation.task else {}
+
+        if operation.op == "create":
+            if data.get("title") is None or data.get("category_id") is None:
+                result.update(status=422, error="title and category_id are required")
+                continue
+            data = schemas.TaskCreate(**data).model_dump()
+        else:
+            if operation.id is None:
+                result.update(status=422, error="id is required")
+                continue
+            if operation.id in seen:
+                result.update(status=409, error="Duplicate id in batch")
+                continue
+            seen.add(operation.id)
+            if operation.id not in owned_ids:
+                result.update(status=404, error="Task not found")
+                continue
+            if operation.op == "delete":
+                result["status"] = 204
+                deletes.append((index, operation.id))
+                continue
+            if not data:
+                result.update(status=422, error="Nothing to update")
+                continue
+            nulls = [field for field in _REQUIRED_TASK_FIELDS if field in data and data[field] is None]
+            if nulls:
+                result.update(status=422, error="%s cannot be null" % ", ".join(nulls))
+                continue
+
+        if "category_id" in data and data["category_id"] not in category_ids:
+            result.update(status=404, error="Category not found")
+            continue
+        if operation.op == "create":
+            result["status"] = 201
+            creates.append((index, data))
+        else:
+            result["status"] = 200
+            updates.append((index, operation.id, data))
+    return results, creates, updates, deletes
+
+def batch_tasks(db: Session, user_id: int, operations: List[schemas.TaskBatchOperation]) -> List[Dict]:
+    """
+    Виконує пакет операцій над завданнями в одній транзакції через
+    масові INSERT/UPDATE/DELETE замість окремих запитів на кожне завдання
+    """
+    ids = [operation.id for operation in operations if operation.op != "create" and operation.id is not None]
+    owned = set()
+    if ids:
+        owned = {
+            task_id for (task_id,) in db.query(models.Task.id)
+            .filter(models.Task.user_id == user_id, models.Task.id.in_(ids))
+            .with_for_update()
+        }
+    category_ids = _get_category_snapshot(db)["names"]
+    results, creates, updates, deletes = plan_task_batch(operations, owned, category_ids)
+
+    if deletes:
+        db.execute(
+            delete(models.Task)
+            .where(models.Task.user_id == user_id, models.Task.id.in_([task_id for _, task_id in deletes]))
+        )
+    if updates:
+        # ORM-оновлення за первинним ключем: executemany, згрупований за набором полів
+        db.execute(update(models.Task), [{"id": task_id, **patch} for _, task_id, patch in updates])
+    if creates:
+        created_ids = db.scalars(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            [{**data, "user_id": user_id} for _, data in creates]
+        ).all()
+        for (index, _), task_id in zip(creates, created_ids):
+            results[index]["id"] = task_id
+    if creates or updates or deletes:
+        _bump_versions(db, models.DataVersion.tasks_key(user_id))
+    db.commit()
+    return results
+
+
+# Час виклику та SQL-запити кожної функції модуля йдуть у метрики
+instrument_module(sys.modules[__name__])
@@ -1,12 +1,96 @@
-from sqlalchemy import create_engine
+import time
+from typing import Dict, Type
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import Pool, QueuePool, StaticPool
 from .config import settings
+from .metrics import observe_acquire, observe_query
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+
+class TimedQueuePool(QueuePool):
+    """Пул з'єднань, що записує час отримання з'єднання в метрики"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_acquire("sync", started)
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def engine_options(url: URL, poolclass: Type[Pool] = TimedQueuePool) -> Dict:
+    """Параметри create_engine залежно від СУБД у DATABASE_URL"""
+    pool = {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+    if url.get_backend_name() == "sqlite":
+        connect_args = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT / 1000}
+        if _is_memory_sqlite(url):
+            # База в пам'яті існує лише в межах одного з'єднання
+            return {"connect_args": connect_args, "poolclass": StaticPool}
+        return {"connect_args": connect_args, **pool}
+    return {
+        **pool,
+        # Розірвані сервером з'єднання виявляються до видачі з пулу
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL: читачі не блокуються записом, а synchronous=NORMAL у WAL
+    # не втрачає узгодженість бази, лише останні транзакції при збої живлення
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=%s" % settings.SQLITE_JOURNAL_MODE)
+        cursor.execute("PRAGMA synchronous=%s" % settings.SQLITE_SYNCHRONOUS)
+        cursor.execute("PRAGMA busy_timeout=%d" % settings.SQLITE_BUSY_TIMEOUT)
+        cursor.execute("PRAGMA mmap_size=%d" % settings.SQLITE_MMAP_SIZE)
+        cursor.execute("PRAGMA cache_size=%d" % settings.SQLITE_CACHE_SIZE)
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    observe_query(context._query_started)
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    if context is not None and hasattr(context, "_query_started"):
+        observe_query(context._query_started, failed=True)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Тривалість і помилки кожного SQL-запиту рушія йдуть у метрики"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def create_db_engine(database_url: str) -> Engine:
+    url = make_url(database_url)
+    engine = create_engine(url, **engine_options(url))
+    if url.get_backend_name() == "sqlite" and not _is_memory_sqlite(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
+
+engine = create_db_engine(settings.DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,4 +101,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -1,9 +1,66 @@
-from sqlalchemy.orm import Session
+"""
+Залежності доступу до БД для роутерів. DB_ASYNC обирає реалізацію:
+асинхронна сесія SQLAlchemy (async_crud) або синхронна (crud), функції
+якої виконуються в пулі потоків, щоб не блокувати цикл подій.
+В обох режимах роутери очікують виклики crud через await
+"""
+import functools
+import inspect
+from contextlib import asynccontextmanager
+from types import ModuleType, SimpleNamespace
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from . import auth
+from .async_database import get_async_sessionmaker
+from .config import settings
 from .database import SessionLocal
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+def _threaded(module: ModuleType) -> SimpleNamespace:
+    """Асинхронні обгортки публічних функцій синхронного модуля, що виконують їх у пулі потоків"""
+    functions = {}
+    for attr, value in vars(module).items():
+        if inspect.isfunction(value) and value.__module__ == module.__name__ and not attr.startswith("_"):
+            async def call(*args, _func=value, **kwargs):
+                return await run_in_threadpool(_func, *args, **kwargs)
+            functions[attr] = functools.wraps(value)(call)
+    return SimpleNamespace(**functions)
+
+
+if settings.DB_ASYNC:
+    from . import async_crud as crud
+    from .async_database import get_async_db as get_db
+    get_current_user = auth.get_current_user_async
+    get_current_user_optional = auth.get_current_user_optional_async
+    authenticate_user = auth.authenticate_user_async
+else:
+    from . import crud as _sync_crud
+    from .database import get_db
+    crud = _threaded(_sync_crud)
+    get_current_user = auth.get_current_user
+    get_current_user_optional = auth.get_current_user_optional
+    authenticate_user = auth.authenticate_user
+
+
+@asynccontextmanager
+async def db_session():
+    """Сесія БД поза залежностями FastAPI (наприклад, у middleware)"""
+    if settings.DB_ASYNC:
+        async with get_async_sessionmaker()() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def hash_new_password(db, username: str, password: str) -> str:
+    """
+    Хеш пароля нового користувача. Зайняте ім'я перевіряється до хешування,
+    щоб повторні реєстрації не займали слоти пулу bcrypt
+    """
+    if await crud.get_user_by_username(db, username):
+        raise HTTPException(status_code=400, detail="User with this username already exists")
+    return await auth.get_password_hash_async(password)
@@ -1,13 +1,17 @@
-from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Request, Depends, HTTPException, status
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from . import models
-from .database import engine, get_db
+from .async_database import dispose_async_engine
+from .database import engine
 from .config import settings
-from .routers import auth, tasks, categories, users
-from .auth import get_current_user_optional
+from .routers import auth, tasks, categories, users, api
+from .auth import setup_password_hasher, shutdown_password_hasher
+from .dependencies import get_current_user_optional
+from .assets import StaticAssets, build_assets
+from .compression import CompressionMiddleware
+from .metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, host_allowed, render_metrics
+from .sessions import SessionRenewalMiddleware
+from .templating import templates, compile_templates
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -27,13 +31,44 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(SessionRenewalMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Файли з хешем вмісту та стиснуті варіанти збираються до монтування
+build_assets()
+app.mount("/static", StaticAssets(), name="static")
 
 app.include_router(auth.router, tags=["Аутентифікація"])
 app.include_router(tasks.router, tags=["Завдання"])
 app.include_router(categories.router, tags=["Категорії"])
 app.include_router(users.router, tags=["Користувачі"])
+app.include_router(api.router)
+
+@app.on_event("startup")
+def startup_templates():
+    compile_templates()
+
+@app.on_event("startup")
+def startup_hasher():
+    setup_password_hasher()
+
+@app.on_event("shutdown")
+def shutdown_hasher():
+    shutdown_password_hasher()
+
+@app.on_event("shutdown")
+async def shutdown_async_engine():
+    await dispose_async_engine()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Метрики Prometheus цього процесу (лише для адрес з METRICS_ALLOWED_HOSTS)
+    """
+    if not host_allowed(request.client.host if request.client else None, settings.METRICS_ALLOWED_HOSTS):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request, current_user: models.User = Depends(get_current_user_optional)):
@@ -0,0 +1,227 @@
+import contextvars
+import functools
+import inspect
+import ipaddress
+import time
+from types import ModuleType
+from typing import Optional, Tuple
+from jinja2 import Template
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Межі гістограм затримок у секундах (від 0.5 мс до 10 с)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being processed")
+CRUD_LATENCY = Histogram(
+    "crud_call_duration_seconds", "Duration of crud function calls",
+    ["function"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duration of individual SQL statements by calling crud function",
+    ["function"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised an error", ["function"])
+DB_ACQUIRE_LATENCY = Histogram(
+    "db_connection_acquire_seconds", "Time spent waiting for a database connection",
+    ["pool"], buckets=LATENCY_BUCKETS
+)
+TEMPLATE_RENDER_LATENCY = Histogram(
+    "template_render_seconds", "Jinja template render time",
+    ["template"], buckets=LATENCY_BUCKETS
+)
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time in the worker pool",
+    ["operation"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds", "Time bcrypt operations waited for a free slot",
+    buckets=LATENCY_BUCKETS
+)
+PASSWORD_HASH_ROUNDS = Gauge("password_hash_rounds", "bcrypt cost used for new password hashes")
+PASSWORD_REHASHES = Counter("password_rehash_total", "Stored password hashes upgraded to the current bcrypt cost")
+LOGIN_REJECTIONS = Counter(
+    "login_rejected_total", "Login attempts rejected before password verification", ["reason"]
+)
+
+# Ім'я crud-функції, з якої виконується поточний SQL-запит
+current_function = contextvars.ContextVar("current_function", default="other")
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
+
+@functools.lru_cache()
+def _networks(allowed: str) -> Tuple:
+    return tuple(
+        ipaddress.ip_network(entry.strip(), strict=False)
+        for entry in allowed.split(",") if entry.strip() and entry.strip() != "*"
+    )
+
+
+def host_allowed(host: Optional[str], allowed: str) -> bool:
+    """Чи входить адреса клієнта до переліку адрес і мереж через кому ("*" - будь-яка)"""
+    if "*" in (entry.strip() for entry in allowed.split(",")):
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except (TypeError, ValueError):
+        return False
+    return any(address in network for network in _networks(allowed))
+
+
+def observe_query(started: float, failed: bool = False) -> None:
+    function = current_function.get()
+    DB_QUERY_LATENCY.labels(function).observe(time.perf_counter() - started)
+    if failed:
+        DB_QUERY_ERRORS.labels(function).inc()
+
+
+def observe_acquire(pool: str, started: float) -> None:
+    DB_ACQUIRE_LATENCY.labels(pool).observe(time.perf_counter() - started)
+
+
+def _instrument(func, name: str):
+    # Попереднє значення відновлюється через set, а не reset(token):
+    # генератори можуть продовжуватись в іншому контексті
+    observe = CRUD_LATENCY.labels(name).observe
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            previous = current_function.get()
+            current_function.set(name)
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            finally:
+                current_function.set(previous)
+                observe(time.perf_counter() - started)
+        return async_gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            previous = current_function.get()
+            current_function.set(name)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                current_function.set(previous)
+                observe(time.perf_counter() - started)
+        return async_wrapper
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            previous = current_function.get()
+            current_function.set(name)
+            try:
+                yield from func(*args, **kwargs)
+            finally:
+                current_function.set(previous)
+                observe(time.perf_counter() - started)
+        return gen_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        previous = current_function.get()
+        current_function.set(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_function.set(previous)
+            observe(time.perf_counter() - started)
+    return wrapper
+
+
+def instrument_module(module: ModuleType) -> None:
+    """
+    Обгортає всі функції, визначені в модулі (crud), вимірюванням часу виклику
+    та позначає SQL-запити всередині них іменем функції.
+    Викликається в кінці модуля; внутрішні виклики теж ідуть через обгортки
+    """
+    for attr, value in list(vars(module).items()):
+        if inspect.isfunction(value) and value.__module__ == module.__name__ and not attr.startswith("_"):
+            setattr(module, attr, _instrument(value, attr))
+
+
+class MetricsTemplate(Template):
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            TEMPLATE_RENDER_LATENCY.labels(self.name or "string").observe(time.perf_counter() - started)
+
+
+def _route_label(scope: Scope, root_path: str) -> str:
+    # Шаблон маршруту замість фактичного шляху, щоб не роздувати кількість міток
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Маршрути Starlette (openapi, docs) та змонтовані застосунки не встановлюють route
+    # (root_path відновлюється, бо Mount змінює його в scope)
+    app = scope.get("app")
+    original = {**scope, "root_path": root_path}
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(original)
+        if match == Match.FULL:
+            return route.path
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: затримка запиту за шаблоном маршруту (до відправки
+    останнього фрагмента тіла, тож потокові відповіді враховуються повністю)
+    та кількість запитів в обробці
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(scope["method"], _route_label(scope, root_path), str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "MetricsMiddleware",
+    "MetricsTemplate",
+    "instrument_module",
+    "observe_acquire",
+    "observe_query",
+    "render_metrics",
+]
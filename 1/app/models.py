@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -36,4 +36,36 @@ class Task(Base):
     category_id = Column(Integer, ForeignKey("categories.id"))
 
     user = relationship("User", back_populates="tasks")
-    category = relationship("Category", back_populates="tasks") 
\ No newline at end of file
+    category = relationship("Category", back_populates="tasks")
+
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+    ) 
+
+class RefreshToken(Base):
+    """
+    Refresh-токени сесій (SHA-256 від випадкового значення з cookie), ротуються
+    при кожному використанні; ротований токен діє ще кілька секунд (rotated_at)
+    """
+    __tablename__ = "refresh_tokens"
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    rotated_at = Column(DateTime)
+
+class DataVersion(Base):
+    """
+    Версії даних для ETag сторінок і скидання кешів: зберігаються в БД, тож
+    спільні для всіх процесів, і збільшуються в транзакції самої зміни
+    """
+    __tablename__ = "data_versions"
+
+    key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    CATEGORIES = "categories"
+
+    @staticmethod
+    def tasks_key(user_id: int) -> str:
+        return "tasks:%s" % user_id
@@ -0,0 +1,114 @@
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, Tuple
+from fastapi import HTTPException, Request, status
+from .config import settings
+from .metrics import LOGIN_REJECTIONS
+
+
+class TokenBucketLimiter:
+    """
+    Обмеження частоти за ключем (token bucket): ключ накопичує до burst спроб,
+    які відновлюються зі швидкістю rate за секунду. Зберігається не більше
+    maxsize ключів - давно не використані витісняються (їхній ліміт знову повний).
+    Викликається лише з циклу подій, тож блокування не потрібне
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: Hashable) -> float:
+        """Списує спробу; повертає 0 або кількість секунд до наступної дозволеної"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginGuard:
+    """
+    Допуск спроб входу до перевірки пароля: частота за IP клієнта та за іменем
+    користувача, а також загальна кількість одночасних перевірок. Понад ліміти
+    запит одразу отримує 429, тож час CPU на bcrypt обмежений
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        ip_per_minute: float,
+        ip_burst: int,
+        username_per_minute: float,
+        username_burst: int,
+        maxsize: int,
+        concurrency: int
+    ):
+        self.enabled = enabled
+        self.by_ip = TokenBucketLimiter(ip_per_minute / 60, ip_burst, maxsize)
+        self.by_username = TokenBucketLimiter(username_per_minute / 60, username_burst, maxsize)
+        self.concurrency = concurrency
+        self.active = 0
+        self.rejected = {"ip": 0, "username": 0, "busy": 0}
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.rejected[reason] += 1
+        LOGIN_REJECTIONS.labels(reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @asynccontextmanager
+    async def attempt(self, request: Request, username: str) -> AsyncIterator[None]:
+        """Перевірка пароля всередині блоку виконується лише для допущеної спроби"""
+        if self.enabled:
+            retry_after = self.by_ip.acquire(request.client.host if request.client else None)
+            if retry_after:
+                self._reject("ip", retry_after)
+            retry_after = self.by_username.acquire(username)
+            if retry_after:
+                self._reject("username", retry_after)
+        if self.active >= self.concurrency:
+            self._reject("busy", 1)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "concurrency": self.concurrency,
+            "tracked_ips": len(self.by_ip),
+            "tracked_usernames": len(self.by_username),
+            "rejected": dict(self.rejected),
+        }
+
+
+login_guard = LoginGuard(
+    enabled=settings.LOGIN_RATE_LIMIT,
+    ip_per_minute=settings.LOGIN_IP_PER_MINUTE,
+    ip_burst=settings.LOGIN_IP_BURST,
+    username_per_minute=settings.LOGIN_USERNAME_PER_MINUTE,
+    username_burst=settings.LOGIN_USERNAME_BURST,
+    maxsize=settings.LOGIN_LIMIT_KEYS,
+    concurrency=settings.LOGIN_CONCURRENCY,
+)
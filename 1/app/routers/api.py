@@ -0,0 +1,211 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import ORJSONResponse
+from typing import Optional, List
+from .. import models, schemas
+from ..dependencies import crud, get_db, get_current_user, hash_new_password
+from ..config import settings
+from ..pagination import ID_KEY, decode_cursor, split_page
+from ..serialization import parse_fields, dump_one, dump_many
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["API v1"],
+    default_response_class=ORJSONResponse,
+    responses={404: {"description": "Not found"}},
+)
+
+FIELDS_DESCRIPTION = "Поля через кому, які потрібно повернути (наприклад id,title,status)"
+
+def _require_admin(current_user: models.User) -> None:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+
+@router.get("/tasks", response_model=schemas.TaskPage, summary="Список завдань (JSON)")
+async def list_tasks(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.TASKS_PAGE_SIZE, ge=1, le=settings.TASKS_PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Завдання поточного користувача сторінками:
+    - **cursor**: курсор наступної сторінки (next_cursor з попередньої відповіді)
+    - **limit**: кількість завдань на сторінці
+    - **fields**: вибір полів
+    """
+    include = parse_fields(fields, schemas.Task)
+    after = decode_cursor(cursor, ID_KEY)
+    tasks = await crud.get_tasks(db, current_user.id, limit=limit + 1, after=after)
+    tasks, next_cursor = split_page(tasks, limit, key=lambda t: (t.id,))
+    return ORJSONResponse({"items": dump_many(schemas.Task, tasks, include), "next_cursor": next_cursor})
+
+@router.post("/tasks/batch", response_model=schemas.TaskBatchResponse, summary="Пакетна зміна завдань (JSON)")
+async def batch_tasks(
+    batch: schemas.TaskBatch,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Створення, оновлення та видалення завдань одним запитом і однією транзакцією:
+    - **op**: create, update (часткове, лише передані поля) або delete
+    - **id**: ID завдання для update/delete
+    - **task**: поля завдання для create/update
+
+    Для кожної операції повертається статус; помилкові операції не заважають решті
+    """
+    if len(batch.operations) > settings.TASKS_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Too many operations (max %d)" % settings.TASKS_BATCH_MAX
+        )
+    results = await crud.batch_tasks(db, current_user.id, batch.operations)
+    return ORJSONResponse({"results": results})
+
+@router.get("/tasks/{task_id}", response_model=schemas.Task, summary="Завдання (JSON)")
+async def get_task(
+    task_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    include = parse_fields(fields, schemas.Task)
+    task = await crud.get_task(db, task_id)
+    if not task or task.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return ORJSONResponse(dump_one(schemas.Task, task, include))
+
+@router.post("/tasks", response_model=schemas.Task, status_code=201, summary="Створення завдання (JSON)")
+async def create_task(
+    task: schemas.TaskCreate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    created = await crud.create_task(db, task, current_user.id)
+    return ORJSONResponse(dump_one(schemas.Task, created), status_code=201)
+
+@router.put("/tasks/{task_id}", response_model=schemas.Task, summary="Оновлення завдання (JSON)")
+async def update_task(
+    task_id: int,
+    task: schemas.TaskCreate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Повна заміна полів завдання
+    """
+    updated = await crud.update_task(db, task_id, schemas.TaskUpdate(**task.model_dump()), current_user.id)
+    return ORJSONResponse(dump_one(schemas.Task, updated))
+
+@router.delete("/tasks/{task_id}", status_code=204, summary="Видалення завдання (JSON)")
+async def delete_task(
+    task_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    await crud.delete_task(db, task_id, current_user.id)
+    return Response(status_code=204)
+
+@router.get("/categories", response_model=List[schemas.Category], summary="Список категорій (JSON)")
+async def list_categories(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    include = parse_fields(fields, schemas.Category)
+    categories = await crud.get_categories(db)
+    return ORJSONResponse(dump_many(schemas.Category, categories, include))
+
+@router.post("/categories", response_model=schemas.Category, status_code=201, summary="Створення категорії (JSON)")
+async def create_category(
+    category: schemas.CategoryCreate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    _require_admin(current_user)
+    created = await crud.create_category(db, category)
+    return ORJSONResponse(dump_one(schemas.Category, created), status_code=201)
+
+@router.put("/categories/{category_id}", response_model=schemas.Category, summary="Оновлення категорії (JSON)")
+async def update_category(
+    category_id: int,
+    category: schemas.CategoryUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    _require_admin(current_user)
+    updated = await crud.update_category(db, category_id, category)
+    return ORJSONResponse(dump_one(schemas.Category, updated))
+
+@router.delete("/categories/{category_id}", status_code=204, summary="Видалення категорії (JSON)")
+async def delete_category(
+    category_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    _require_admin(current_user)
+    await crud.delete_category(db, category_id)
+    return Response(status_code=204)
+
+@router.get("/users", response_model=schemas.UserPage, summary="Список користувачів (JSON)")
+async def list_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.TASKS_PAGE_SIZE, ge=1, le=settings.TASKS_PAGE_SIZE_MAX),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Користувачі сторінками (тільки для адміністраторів)
+    """
+    _require_admin(current_user)
+    include = parse_fields(fields, schemas.User)
+    after = decode_cursor(cursor, ID_KEY)
+    users = await crud.get_users(db, limit=limit + 1, after=after)
+    users, next_cursor = split_page(users, limit, key=lambda u: (u.id,))
+    return ORJSONResponse({"items": dump_many(schemas.User, users, include), "next_cursor": next_cursor})
+
+@router.get("/users/me", response_model=schemas.User, summary="Поточний користувач (JSON)")
+async def get_me(
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user)
+):
+    return ORJSONResponse(dump_one(schemas.User, current_user, parse_fields(fields, schemas.User)))
+
+@router.post("/users", response_model=schemas.User, status_code=201, summary="Створення користувача (JSON)")
+async def create_user(
+    user: schemas.UserCreate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    _require_admin(current_user)
+    hashed_password = await hash_new_password(db, user.username, user.password)
+    created = await crud.create_user(db, user, hashed_password=hashed_password)
+    return ORJSONResponse(dump_one(schemas.User, created), status_code=201)
+
+@router.put("/users/{user_id}", response_model=schemas.User, summary="Оновлення користувача (JSON)")
+async def update_user(
+    user_id: int,
+    user: schemas.UserUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """
+    Оновлення імені та ролі; якщо role не передано, роль не змінюється
+    """
+    _require_admin(current_user)
+    updated = await crud.update_user(db, user_id, schemas.UserUpdate(username=user.username, role=user.role))
+    return ORJSONResponse(dump_one(schemas.User, updated))
+
+@router.delete("/users/{user_id}", status_code=204, summary="Видалення користувача (JSON)")
+async def delete_user(
+    user_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    _require_admin(current_user)
+    await crud.delete_user(db, user_id)
+    return Response(status_code=204)
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
+from fastapi import APIRouter, Request, Depends, HTTPException, status, Form, Cookie
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from .. import models, schemas, crud, auth
-from ..database import get_db
+from .. import models, schemas, sessions
+from ..dependencies import authenticate_user, crud, get_db, hash_new_password
+from ..ratelimit import login_guard
+from ..templating import templates
 
 router = APIRouter(
     prefix="/auth",
@@ -11,8 +11,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("/login", response_class=HTMLResponse, summary="Сторінка входу")
 async def login_page(request: Request):
     """
@@ -21,21 +19,22 @@ async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @router.post("/login", summary="Вхід в систему")
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def login(request: Request, username: str = Form(...), password: str = Form(...), db = Depends(get_db)):
     """
     Аутентифікація користувача:
     - **username**: ім'я користувача
     - **password**: пароль користувача
     """
-    user = auth.authenticate_user(db, username, password)
+    async with login_guard.attempt(request, username):
+        user = await authenticate_user(db, username, password)
     if not user:
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": "Invalid username or password"}
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    access_token, refresh_token = await sessions.start_session(db, user)
     response = RedirectResponse(url="/tasks", status_code=303)
-    response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
+    sessions.set_session_cookies(response, access_token, refresh_token)
     return response
 
 @router.get("/register", response_class=HTMLResponse, summary="Сторінка реєстрації")
@@ -51,7 +50,7 @@ async def register(
     username: str = Form(...),
     password: str = Form(...),
     role: str = Form("user"),
-    db: Session = Depends(get_db)
+    db = Depends(get_db)
 ):
     """
     Реєстрація нового користувача:
@@ -60,7 +59,12 @@ async def register(
     - **role**: роль користувача (за замовчуванням "user")
     """
     try:
-        user = crud.create_user(db, schemas.UserCreate(username=username, password=password, role=role))
+        hashed_password = await hash_new_password(db, username, password)
+        user = await crud.create_user(
+            db,
+            schemas.UserCreate(username=username, password=password, role=role),
+            hashed_password=hashed_password
+        )
         return RedirectResponse(url="/auth/login", status_code=303)
     except HTTPException as e:
         return templates.TemplateResponse(
@@ -69,10 +73,12 @@ async def register(
         )
 
 @router.get("/logout", summary="Вихід з системи")
-async def logout():
+async def logout(refresh_token: str = Cookie(None, alias="refresh_token"), db = Depends(get_db)):
     """
-    Вихід з системи та видалення токена доступу
+    Вихід з системи: завершення сесії та видалення токенів
     """
+    if refresh_token:
+        await sessions.end_session(db, refresh_token)
     response = RedirectResponse(url="/auth/login", status_code=303)
-    response.delete_cookie("access_token")
+    sessions.clear_session_cookies(response)
     return response 
\ No newline at end of file
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from .. import models, schemas, crud, auth
-from ..database import get_db
+from .. import models, schemas
+from ..crud import category_cache
+from ..dependencies import crud, get_db, get_current_user
+from ..etag import make_etag, is_not_modified, not_modified, set_etag
+from ..templating import templates
 
 router = APIRouter(
     prefix="/categories",
@@ -11,13 +12,11 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("", response_class=HTMLResponse, summary="Список категорій")
 async def categories_page(
     request: Request,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Відображає сторінку зі списком категорій (тільки для адміністраторів)
@@ -32,18 +31,24 @@ async def categories_page(
                 "error": "Insufficient permissions"
             }
         )
-    categories = crud.get_categories(db)
-    return templates.TemplateResponse(
+    version = (await crud.get_data_versions(db, models.DataVersion.CATEGORIES))[models.DataVersion.CATEGORIES]
+    category_cache.observe(version)
+    etag = make_etag("categories", current_user.id, current_user.username, version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    categories = await crud.get_categories(db)
+    response = templates.TemplateResponse(
         "categories.html",
         {"request": request, "current_user": current_user, "categories": categories}
     )
+    return set_etag(response, etag)
 
 @router.post("", summary="Створення нової категорії")
 async def create_category(
     request: Request,
     name: str = Form(...),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Створення нової категорії (тільки для адміністраторів):
@@ -60,10 +65,10 @@ async def create_category(
             }
         )
     try:
-        crud.create_category(db, schemas.CategoryCreate(name=name))
+        await crud.create_category(db, schemas.CategoryCreate(name=name))
         return RedirectResponse(url="/categories", status_code=303)
     except HTTPException as e:
-        categories = crud.get_categories(db)
+        categories = await crud.get_categories(db)
         return templates.TemplateResponse(
             "categories.html",
             {
@@ -79,8 +84,8 @@ async def update_category(
     request: Request,
     category_id: int,
     name: str = Form(...),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Оновлення існуючої категорії (тільки для адміністраторів):
@@ -98,10 +103,10 @@ async def update_category(
             }
         )
     try:
-        crud.update_category(db, category_id, schemas.CategoryUpdate(name=name))
+        await crud.update_category(db, category_id, schemas.CategoryUpdate(name=name))
         return RedirectResponse(url="/categories", status_code=303)
     except HTTPException as e:
-        categories = crud.get_categories(db)
+        categories = await crud.get_categories(db)
         return templates.TemplateResponse(
             "categories.html",
             {
@@ -116,8 +121,8 @@ async def update_category(
 async def delete_category(
     request: Request,
     category_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Видалення категорії (тільки для адміністраторів):
@@ -133,5 +138,5 @@ async def delete_category(
                 "error": "Insufficient permissions"
             }
         )
-    crud.delete_category(db, category_id)
+    await crud.delete_category(db, category_id)
     return RedirectResponse(url="/categories", status_code=303) 
\ No newline at end of file
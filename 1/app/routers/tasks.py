@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request, Depends, HTTPException, status, Form, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from typing import Optional
 from datetime import datetime
-from .. import models, schemas, crud, auth
-from ..database import get_db
+from .. import models, schemas
+from ..async_database import get_async_sessionmaker
+from ..crud import category_cache, iter_tasks
+from ..dependencies import crud, get_db, get_current_user
+from ..database import SessionLocal
+from ..config import settings
+from ..etag import make_etag, is_not_modified, not_modified, set_etag
+from ..pagination import ID_KEY, decode_cursor, split_page
+from ..templating import templates, stream_templates
 
 router = APIRouter(
     prefix="/tasks",
@@ -13,7 +18,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
+# Мінімальний розмір фрагмента HTML, що відправляється клієнту
+STREAM_CHUNK_SIZE = 16 * 1024
 
 # Словник для перетворення рядкових значень пріоритету в числові
 PRIORITY_MAP = {
@@ -22,26 +28,101 @@ PRIORITY_MAP = {
     "high": 5
 }
 
+def _stream_tasks_page(context: dict, user_id: int):
+    """
+    Рендерить tasks.html частинами: шапка сторінки відправляється одразу,
+    а рядки таблиці - у міру читання з курсора
+    """
+    template = templates.get_template("tasks.html")
+    # Сесія запиту закривається до відправки тіла, тому потоку потрібна власна
+    db = SessionLocal()
+    try:
+        context["tasks"] = iter_tasks(db, user_id)
+        buffer, size = [], 0
+        for chunk in template.generate(context):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        db.close()
+
+async def _stream_tasks_page_async(context: dict, user_id: int):
+    """
+    Варіант _stream_tasks_page для асинхронної сесії (DB_ASYNC):
+    рядки читаються з серверного курсора без блокування циклу подій
+    """
+    template = stream_templates.get_template("tasks.html")
+    async with get_async_sessionmaker()() as db:
+        context["tasks"] = crud.iter_tasks(db, user_id)
+        buffer, size = [], 0
+        async for chunk in template.generate_async(context):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
 @router.get("", response_class=HTMLResponse, summary="Список завдань")
 async def tasks_page(
     request: Request,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.TASKS_PAGE_SIZE, ge=1, le=settings.TASKS_PAGE_SIZE_MAX),
+    stream: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
-    Відображає сторінку зі списком завдань користувача
+    Відображає сторінку зі списком завдань користувача:
+    - **cursor**: курсор наступної сторінки
+    - **limit**: кількість завдань на сторінці
+    - **stream**: показати всі завдання, рендерячи сторінку потоково
     """
-    tasks = crud.get_tasks(db, current_user.id)
-    categories = crud.get_categories(db)
-    return templates.TemplateResponse(
+    if stream:
+        context = {
+            "request": request,
+            "current_user": current_user,
+            "categories": await crud.get_categories(db)
+        }
+        stream_page = _stream_tasks_page_async if settings.DB_ASYNC else _stream_tasks_page
+        return StreamingResponse(
+            stream_page(context, current_user.id),
+            media_type="text/html; charset=utf-8"
+        )
+
+    # Версії читаються до запитів: зміна під час рендерингу дасть новий ETag
+    task_key = models.DataVersion.tasks_key(current_user.id)
+    versions = await crud.get_data_versions(db, task_key, models.DataVersion.CATEGORIES)
+    category_cache.observe(versions[models.DataVersion.CATEGORIES])
+    etag = make_etag(
+        "tasks", current_user.id, current_user.username, current_user.role,
+        versions[task_key], versions[models.DataVersion.CATEGORIES], cursor, limit
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    after = decode_cursor(cursor, ID_KEY)
+    tasks = await crud.get_tasks(db, current_user.id, limit=limit + 1, after=after)
+    tasks, next_cursor = split_page(tasks, limit, key=lambda t: (t.id,))
+    categories = await crud.get_categories(db)
+    response = templates.TemplateResponse(
         "tasks.html",
         {
             "request": request,
             "current_user": current_user,
             "tasks": tasks,
-            "categories": categories
+            "categories": categories,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+            "limit": limit
         }
     )
+    return set_etag(response, etag)
 
 @router.post("", summary="Створення нового завдання")
 async def create_task(
@@ -52,8 +133,8 @@ async def create_task(
     status: str = Form("pending"),
     priority: str = Form("medium"),
     due_date: Optional[str] = Form(None),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Створення нового завдання:
@@ -77,7 +158,7 @@ async def create_task(
             due_date=datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
         )
         
-        task = crud.create_task(db, task_data, current_user.id)
+        task = await crud.create_task(db, task_data, current_user.id)
         return RedirectResponse(url="/tasks", status_code=303)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -94,8 +175,8 @@ async def update_task(
     status: str = Form(...),
     priority: str = Form(None),
     due_date: Optional[str] = Form(None),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Оновлення існуючого завдання:
@@ -108,7 +189,7 @@ async def update_task(
     - **due_date**: термін виконання (YYYY-MM-DD)
     """
     try:
-        task = crud.get_task(db, task_id)
+        task = await crud.get_task(db, task_id)
         if not task or task.user_id != current_user.id:
             raise HTTPException(status_code=404, detail="Task not found")
         
@@ -123,7 +204,7 @@ async def update_task(
             priority=priority_value,
             due_date=datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
         )
-        crud.update_task(db, task_id, task_data, current_user.id)
+        await crud.update_task(db, task_id, task_data, current_user.id)
         return RedirectResponse(url="/tasks", status_code=303)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -133,18 +214,18 @@ async def update_task(
 @router.delete("/{task_id}", summary="Видалення завдання")
 async def delete_task(
     task_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Видалення завдання:
     - **task_id**: ID завдання для видалення
     """
     try:
-        task = crud.get_task(db, task_id)
+        task = await crud.get_task(db, task_id)
         if not task or task.user_id != current_user.id:
             raise HTTPException(status_code=404, detail="Task not found")
-        crud.delete_task(db, task_id, current_user.id)
+        await crud.delete_task(db, task_id, current_user.id)
         return RedirectResponse(url="/tasks", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from .. import models, schemas, crud, auth
-from ..database import get_db
+from .. import models, schemas
+from ..dependencies import crud, get_db, get_current_user, hash_new_password
+from ..templating import templates
 
 router = APIRouter(
     prefix="/users",
@@ -11,13 +10,11 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("", response_class=HTMLResponse, summary="Список користувачів")
 async def users_page(
     request: Request,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Відображає сторінку зі списком користувачів (тільки для адміністраторів)
@@ -32,7 +29,7 @@ async def users_page(
                 "error": "Insufficient permissions"
             }
         )
-    users = crud.get_users(db)
+    users = await crud.get_users(db)
     return templates.TemplateResponse(
         "users.html",
         {"request": request, "current_user": current_user, "users": users}
@@ -44,8 +41,8 @@ async def create_user(
     username: str = Form(...),
     password: str = Form(...),
     role: str = Form("user"),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Створення нового користувача (тільки для адміністраторів):
@@ -64,10 +61,15 @@ async def create_user(
             }
         )
     try:
-        crud.create_user(db, schemas.UserCreate(username=username, password=password, role=role))
+        hashed_password = await hash_new_password(db, username, password)
+        await crud.create_user(
+            db,
+            schemas.UserCreate(username=username, password=password, role=role),
+            hashed_password=hashed_password
+        )
         return RedirectResponse(url="/users", status_code=303)
     except HTTPException as e:
-        users = crud.get_users(db)
+        users = await crud.get_users(db)
         return templates.TemplateResponse(
             "users.html",
             {
@@ -84,8 +86,8 @@ async def update_user(
     user_id: int,
     username: str = Form(...),
     role: str = Form(...),
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Оновлення даних користувача (тільки для адміністраторів):
@@ -104,10 +106,10 @@ async def update_user(
             }
         )
     try:
-        crud.update_user(db, user_id, schemas.UserUpdate(username=username, role=role))
+        await crud.update_user(db, user_id, schemas.UserUpdate(username=username, role=role))
         return RedirectResponse(url="/users", status_code=303)
     except HTTPException as e:
-        users = crud.get_users(db)
+        users = await crud.get_users(db)
         return templates.TemplateResponse(
             "users.html",
             {
@@ -122,8 +124,8 @@ async def update_user(
 async def delete_user(
     request: Request,
     user_id: int,
-    current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user),
+    db = Depends(get_db)
 ):
     """
     Видалення користувача (тільки для адміністраторів):
@@ -139,5 +141,5 @@ async def delete_user(
                 "error": "Insufficient permissions"
             }
         )
-    crud.delete_user(db, user_id)
+    await crud.delete_user(db, user_id)
     return RedirectResponse(url="/users", status_code=303) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -57,6 +57,32 @@ class Task(TaskBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None
+
+class TaskPage(BaseModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+class TaskBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    task: Optional[TaskUpdate] = None
+
+class TaskBatch(BaseModel):
+    operations: List[TaskBatchOperation]
+
+class TaskBatchResult(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchResult]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,42 @@
+import os
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from .assets import static_url
+from .config import settings
+from .metrics import MetricsTemplate
+
+TEMPLATES_DIR = "app/templates"
+
+
+def _create_environment(enable_async: bool = False) -> Environment:
+    # Скомпільований код синхронних і асинхронних шаблонів різний,
+    # а ключ кешу залежить лише від імені файлу - тому окремі каталоги
+    cache_dir = os.path.join(settings.TEMPLATE_CACHE_DIR, "async" if enable_async else "sync")
+    os.makedirs(cache_dir, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        # Без DEBUG шаблони не перевіряються на зміни при кожному зверненні
+        auto_reload=bool(settings.DEBUG),
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        enable_async=enable_async
+    )
+    env.template_class = MetricsTemplate
+    env.globals["static_url"] = static_url
+    return env
+
+
+# Спільне оточення для всіх сторінок
+templates = Jinja2Templates(env=_create_environment())
+# Асинхронне оточення для потокового рендерингу з асинхронною сесією (DB_ASYNC)
+stream_templates = Jinja2Templates(env=_create_environment(enable_async=True))
+
+
+def compile_templates() -> None:
+    """
+    Компілює всі шаблони при старті: нові процеси беруть байт-код з кешу
+    на диску замість розбору шаблонів при першому запиті
+    """
+    for templates_ in (templates, stream_templates):
+        for name in templates_.env.list_templates():
+            templates_.env.get_template(name)
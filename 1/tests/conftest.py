@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+# Тести працюють з окремою базою SQLite, створеною застосунком при імпорті
+os.environ["DATABASE_URL"] = "sqlite:///%s" % os.path.join(tempfile.mkdtemp(), "test.db")
+
+# Налаштування за замовчуванням, щоб модулі застосунку імпортувались без .env
+for name, value in {
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DEBUG": "false",
+    "HOST": "127.0.0.1",
+    "PORT": "8000",
+    # Мінімальна вартість bcrypt: хешування не є предметом тестів
+    "PASSWORD_HASH_ROUNDS": "4",
+    "PASSWORD_HASH_MIN_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,31 @@
+"""
+Версії даних збільшуються однаково через INSERT ... ON CONFLICT і через
+переносний UPDATE-then-INSERT для СУБД без upsert
+"""
+import pytest
+from app import crud, models
+from app.database import SessionLocal, engine
+
+KEYS = ("versions-a", "versions-b")
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.query(models.DataVersion).filter(models.DataVersion.key.in_(KEYS)).delete()
+        db.commit()
+        yield db
+
+
+@pytest.mark.parametrize("dialect_name", [engine.dialect.name, "other"])
+def test_bump_creates_and_increments(db, dialect_name):
+    for statement in crud._bump_statements(dialect_name, KEYS[0]):
+        db.execute(statement)
+    for statement in crud._bump_statements(dialect_name, *KEYS):
+        db.execute(statement)
+    db.commit()
+
+    assert crud.get_data_versions(db, *KEYS, "versions-missing") == {
+        "versions-a": 2, "versions-b": 1, "versions-missing": 0
+    }
@@ -0,0 +1,77 @@
+"""
+Кількість SQL-запитів сторінок зі списком завдань не залежить від кількості
+завдань: категорії завантажуються разом із завданнями, а не окремо для кожного
+(різні категорії у всіх завдань, тож мапа ідентичності не приховує зайві запити)
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.main import app
+
+PATHS = [
+    "/tasks?limit=%d" % settings.TASKS_PAGE_SIZE_MAX,
+    "/tasks?stream=true",
+    "/api/v1/tasks?limit=%d" % settings.TASKS_PAGE_SIZE_MAX,
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        client.post("/auth/register", data={"username": "counter", "password": "secret"})
+        response = client.post(
+            "/auth/login", data={"username": "counter", "password": "secret"}, follow_redirects=False
+        )
+        assert "access_token" in response.cookies
+        yield client
+
+
+def _seed_tasks(count: int) -> None:
+    """Замінює завдання користувача на count нових, кожне у власній категорії"""
+    with SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.username == "counter").one()
+        categories = db.query(models.Category).all()
+        for index in range(len(categories), count):
+            category = models.Category(name="category-%d" % index)
+            db.add(category)
+            categories.append(category)
+        db.query(models.Task).delete()
+        db.flush()
+        db.add_all([
+            models.Task(
+                title="task-%d" % index, status="pending", priority=3,
+                user_id=user.id, category_id=categories[index].id
+            )
+            for index in range(count)
+        ])
+        db.commit()
+
+
+def _count_statements(client: TestClient, path: str) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Слухач на класі Engine охоплює і синхронний рушій, і рушій DB_ASYNC
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_task_list_query_count_is_constant(client, path):
+    counts = {}
+    for count in (5, 200):
+        _seed_tasks(count)
+        client.get(path)  # прогрів кешів користувача та категорій
+        counts[count] = _count_statements(client, path)
+    assert counts[5] == counts[200], counts
@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional
+import brotli
+from jinja2 import pass_context
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+from .config import settings
+
+STATIC_DIR = "app/static"
+MANIFEST_NAME = "manifest.json"
+
+# Файли з хешем у назві ніколи не змінюються - браузер не перевіряє їх повторно
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Стискаються лише текстові формати; зображення та шрифти вже стиснуті
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+# Порядок переваги кодувань при узгодженні з Accept-Encoding
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Відповідність "style.css" -> "style.<хеш>.css" після build_assets()
+manifest: Dict[str, str] = {}
+_fingerprinted: set = set()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Кілька процесів можуть збирати ті самі файли одночасно
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _fingerprint(name: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    root, ext = os.path.splitext(name)
+    return "%s.%s%s" % (root, digest, ext)
+
+
+def build_assets(source: str = STATIC_DIR, target: Optional[str] = None) -> Dict[str, str]:
+    """
+    Копіює статичні файли в target під назвами з хешем вмісту та записує
+    поряд стиснуті варіанти .gz та .br. Вже зібрані версії повторно не стискаються,
+    тож збірка при старті кожного процесу дешева
+    """
+    target = target or settings.STATIC_BUILD_DIR
+    result = {}
+    for root, _, files in os.walk(source):
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                data = f.read()
+            hashed = _fingerprint(name, data)
+            result[name] = hashed
+
+            os.makedirs(os.path.dirname(os.path.join(target, name)), exist_ok=True)
+            # Оригінальні назви лишаються доступними (без довгого кешування)
+            _write_atomic(os.path.join(target, name), data)
+            hashed_path = os.path.join(target, hashed)
+            if os.path.exists(hashed_path):
+                continue
+            if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                _write_atomic(hashed_path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                _write_atomic(hashed_path + ".br", brotli.compress(data, quality=11))
+            _write_atomic(hashed_path, data)
+
+    _write_atomic(os.path.join(target, MANIFEST_NAME), json.dumps(result, indent=2).encode())
+    manifest.clear()
+    manifest.update(result)
+    _fingerprinted.clear()
+    _fingerprinted.update(result.values())
+    return result
+
+
+@pass_context
+def static_url(context, name: str) -> str:
+    """Шаблонний помічник: URL файлу з хешем у назві ({{ static_url('style.css') }})"""
+    return str(context["request"].url_for("static", path="/" + manifest.get(name, name)))
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        if params in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssets(StaticFiles):
+    """
+    Роздає зібрані build_assets() файли: для назв з хешем -
+    Cache-Control: immutable та попередньо стиснутий варіант за Accept-Encoding
+    """
+
+    def __init__(self, directory: Optional[str] = None, **kwargs):
+        super().__init__(directory=directory or settings.STATIC_BUILD_DIR, **kwargs)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        name = path.replace(os.sep, "/")
+        if name not in _fingerprinted:
+            return await super().get_response(path, scope)
+
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            full_path = os.path.join(self.directory, path + suffix)
+            if encoding in accepted and os.path.isfile(full_path):
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                return FileResponse(
+                    full_path,
+                    media_type=media_type,
+                    headers={**headers, "Content-Encoding": encoding},
+                    stat_result=os.stat(full_path)
+                )
+
+        response = await super().get_response(path, scope)
+        response.headers.update(headers)
+        return response
+
+
+if __name__ == "__main__":
+    # Збірка як окремий крок розгортання: python -m app.assets
+    print(json.dumps(build_assets(), indent=2))
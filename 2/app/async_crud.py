@@ -0,0 +1,465 @@
+import sys
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from psycopg import errors
+from psycopg.types.json import Jsonb
+from . import schemas
+from .metrics import instrument_module
+from .search import build_search_query
+from .auth import get_password_hash_async, user_cache
+from .config import settings
+from .crud import BATCH_UPDATE_SET, DELETE_USER_SQL, TASK_RETURNING, category_cache, plan_task_batch
+from .revocation import revocations
+
+async def get_user(db, user_id: int) -> Optional[Dict]:
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+        return await cursor.fetchone()
+
+async def get_user_by_username(db, username: str) -> Optional[Dict]:
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+        return await cursor.fetchone()
+
+async def get_users(
+    db,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None
+) -> List[Dict]:
+    query = "SELECT * FROM users"
+    params = []
+    if after:
+        query += " WHERE id > %s"
+        params.append(after[0])
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    async with db.cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+async def create_user(db, user: schemas.UserCreate, hashed_password: Optional[str] = None) -> Dict:
+    # Роутери передають хеш з auth.hash_new_password, обчислений після перевірки імені
+    if hashed_password is None:
+        hashed_password = await get_password_hash_async(user.password)
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO users (username, hashed_password, role) VALUES (%s, %s, %s)
+            ON CONFLICT (username) DO NOTHING
+            RETURNING *
+            """,
+            (user.username, hashed_password, user.role)
+        )
+        result = await cursor.fetchone()
+        await db.commit()
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    return result
+
+async def update_user(db, user_id: int, user: schemas.UserUpdate) -> Dict:
+    # Самооб'єднання повертає попереднє ім'я для інвалідації кешу;
+    # зміна імені чи ролі збільшує покоління, відкликаючи видані токени
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                """
+                UPDATE users u SET username = %s, role = COALESCE(%s, u.role),
+                    token_generation = u.token_generation
+                        + CASE WHEN u.username <> %s OR u.role <> COALESCE(%s, u.role) THEN 1 ELSE 0 END
+                FROM users old
+                WHERE u.id = %s AND old.id = u.id
+                RETURNING u.*, old.username AS old_username
+                """,
+                (user.username, user.role, user.username, user.role, user_id)
+            )
+            result = await cursor.fetchone()
+            await db.commit()
+    except errors.UniqueViolation:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already taken"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    user_cache.invalidate(result.pop('old_username'), result['username'])
+    revocations.set_generation(result['id'], result['token_generation'])
+    return result
+
+async def delete_user(db, user_id: int) -> None:
+    async with db.cursor() as cursor:
+        await cursor.execute(DELETE_USER_SQL, (user_id, settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+        result = await cursor.fetchone()
+        await db.commit()
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    user_cache.invalidate(result['username'])
+    revocations.forget_user(user_id)
+
+async def create_refresh_token(db, user_id: int, token_hash: str, expires_at: datetime) -> None:
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "INSERT INTO refresh_tokens (token_hash, user_id, expires_at) VALUES (%s, %s, %s)",
+            (token_hash, user_id, expires_at)
+        )
+        await db.commit()
+
+async def rotate_refresh_token(
+    db,
+    token_hash: str,
+    new_hash: str,
+    expires_at: datetime,
+    grace: float
+) -> Optional[Dict]:
+    """
+    Замінює дійсний refresh-токен новим одним запитом і повертає його власника.
+    Старий токен позначається ротованим і діє ще grace секунд (див. get_rotated_token_user);
+    вже ротований або прострочений токен дає None
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            """
+            WITH used AS (
+                UPDATE refresh_tokens
+                SET rotated_at = now(), expires_at = LEAST(expires_at, now() + make_interval(secs => %s))
+                WHERE token_hash = %s AND rotated_at IS NULL AND expires_at > now()
+                RETURNING user_id
+            ), issued AS (
+                INSERT INTO refresh_tokens (token_hash, user_id, expires_at)
+                SELECT %s, user_id, %s FROM used
+                RETURNING user_id
+            ), purged AS (
+                -- Прострочені та давно ротовані токени користувача (ротованим expires_at скорочено до grace)
+                DELETE FROM refresh_tokens
+                WHERE user_id IN (SELECT user_id FROM used) AND expires_at <= now()
+            )
+            SELECT u.* FROM users u JOIN issued ON issued.user_id = u.id
+            """,
+            (grace, token_hash, new_hash, expires_at)
+        )
+        result = await cursor.fetchone()
+        await db.commit()
+    return result
+
+async def get_rotated_token_user(db, token_hash: str) -> Optional[Dict]:
+    """
+    Власник токена, ротованого іншим запитом менш ніж grace секунд тому.
+    Окремий запит: його знімок уже бачить ротацію, на яку чекав rotate_refresh_token
+    """
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT u.* FROM refresh_tokens r JOIN users u ON u.id = r.user_id
+            WHERE r.token_hash = %s AND r.rotated_at IS NOT NULL AND r.expires_at > now()
+            """,
+            (token_hash,)
+        )
+        return await cursor.fetchone()
+
+async def delete_refresh_token(db, token_hash: str) -> None:
+    async with db.cursor() as cursor:
+        # Заодно прибираються прострочені токени всіх користувачів
+        await cursor.execute(
+            "DELETE FROM refresh_tokens WHERE token_hash = %s OR expires_at <= now()", (token_hash,)
+        )
+        await db.commit()
+
+async def get_data_versions(db, *keys: str) -> Dict[str, int]:
+    """Спільні для всіх процесів версії даних за ключами; ключ без змін має версію 0"""
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT key, version FROM data_versions WHERE key = ANY(%s)", (list(keys),))
+        versions = {row['key']: row['version'] for row in await cursor.fetchall()}
+    return {key: versions.get(key, 0) for key in keys}
+
+async def get_category(db, category_id: int) -> Optional[Dict]:
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
+        return await cursor.fetchone()
+
+async def _get_category_snapshot(db) -> Dict:
+    snapshot = category_cache.get()
+    if snapshot is not None:
+        return snapshot
+    version = category_cache.version
+    async with db.cursor() as cursor:
+        await cursor.execute("SELECT * FROM categories ORDER BY id")
+        categories = await cursor.fetchall()
+    snapshot = {
+        "list": categories,
+        "names": {category['id']: category['name'] for category in categories}
+    }
+    category_cache.set(snapshot, version)
+    return snapshot
+
+async def get_categories(db) -> List[Dict]:
+    return list((await _get_category_snapshot(db))["list"])
+
+async def category_exists(db, category_id: int) -> bool:
+    return category_id in (await _get_category_snapshot(db))["names"]
+
+async def create_category(db, category: schemas.CategoryCreate) -> Dict:
+    async with db.cursor() as cursor:
+        await cursor.execute(
+            "INSERT INTO categories (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING *",
+            (category.name,)
+        )
+        result = await cursor.fetchone()
+        await db.commit()
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category already exists"
+        )
+    category_cache.bump()
+    return result
+
+async def update_category(db, category_id: int, category: schemas.CategoryUpdate) -> Dict:
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE categories SET name = %s WHERE id = %s RETURNING *",
+                (category.name, category_id)
+            )
+            result = await cursor.fetchone()
+            await db.commit()
+    except errors.UniqueViolation:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category already exists"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    category_cache.bump()
+    return result
+
+async def delete_category(db, category_id: int) -> None:
+    async with db.cursor() as cursor:
+        await cursor.execute("DELETE FROM categories WHERE id = %s RETURNING id", (category_id,))
+        deleted = await cursor.fetchone()
+        await db.commit()
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    category_cache.bump()
+
+async def get_task(db, task_id: int) -> Optional[Dict]:
+    async with db.cursor() as cursor:
+        await cursor.execute("""
+            SELECT t.*, c.name as category_name 
+            FROM tasks t 
+            LEFT JOIN categories c ON t.category_id = c.id 
+            WHERE t.id = %s
+        """, (task_id,))
+        return await cursor.fetchone()
+
+async def get_tasks(
+    db,
+    user_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None
+) -> List[Dict]:
+    """
+    Завдання користувача в порядку id; after - ключ (id,) останнього
+    рядка попередньої сторінки (keyset-пагінація)
+    """
+    query = """
+        SELECT t.*, c.name as category_name 
+        FROM tasks t 
+        LEFT JOIN categories c ON t.category_id = c.id 
+        WHERE t.user_id = %s
+    """
+    params = [user_id]
+    if after:
+        query += " AND t.id > %s"
+        params.append(after[0])
+    query += " ORDER BY t.id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    async with db.cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+async def iter_tasks(db, user_id: int, batch_size: int = 500):
+    """
+    Ітерує всі завдання користувача через серверний курсор,
+    отримуючи рядки пачками по batch_size
+    """
+    async with db.cursor(name="tasks_stream") as cursor:
+        cursor.itersize = batch_size
+        await cursor.execute("""
+            SELECT t.*, c.name as category_name 
+            FROM tasks t 
+            LEFT JOIN categories c ON t.category_id = c.id 
+            WHERE t.user_id = %s
+            ORDER BY t.id
+        """, (user_id,))
+        async for row in cursor:
+            yield row
+
+async def create_task(db, task: schemas.TaskCreate, user_id: int) -> Dict:
+    # Існування категорії перевіряє зовнішній ключ
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """ + TASK_RETURNING, (
+                task.title,
+                task.description,
+                task.status,
+                task.priority,
+                task.due_date,
+                user_id,
+                task.category_id
+            ))
+            result = await cursor.fetchone()
+            await db.commit()
+    except errors.ForeignKeyViolation:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    return result
+
+async def update_task(db, task_id: int, task: schemas.TaskUpdate, user_id: int) -> Dict:
+    # Незаповнені обов'язкові поля (title, status, priority, category_id) лишаються без змін
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute("""
+                UPDATE tasks
+                SET title = COALESCE(%s, title), description = %s, status = COALESCE(%s, status),
+                    priority = COALESCE(%s::varchar, priority), due_date = %s,
+                    category_id = COALESCE(%s, category_id)
+                WHERE id = %s AND user_id = %s
+            """ + TASK_RETURNING, (
+                task.title,
+                task.description,
+                task.status,
+                task.priority,
+                task.due_date,
+                task.category_id,
+                task_id,
+                user_id
+            ))
+            result = await cursor.fetchone()
+            await db.commit()
+    except errors.ForeignKeyViolation:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return result
+
+async def delete_task(db, task_id: int, user_id: int) -> None:
+    async with db.cursor() as cursor:
+        await cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s RETURNING id", (task_id, user_id))
+        deleted = await cursor.fetchone()
+        await db.commit()
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+async def batch_tasks(db, user_id: int, operations: List[schemas.TaskBatchOperation]) -> List[Dict]:
+    """
+    Виконує пакет операцій над завданнями в одній транзакції:
+    по одному запиту на кожен вид операцій, значення передаються масивами
+    """
+    ids = [operation.id for operation in operations if operation.op != "create" and operation.id is not None]
+    owned = set()
+    async with db.cursor() as cursor:
+        if ids:
+            await cursor.execute(
+                "SELECT id FROM tasks WHERE user_id = %s AND id = ANY(%s) FOR UPDATE",
+                (user_id, ids)
+            )
+            owned = {row['id'] for row in await cursor.fetchall()}
+    category_ids = (await _get_category_snapshot(db))["names"]
+    results, creates, updates, deletes = plan_task_batch(operations, owned, category_ids)
+
+    async with db.cursor() as cursor:
+        if deletes:
+            await cursor.execute(
+                "DELETE FROM tasks WHERE user_id = %s AND id = ANY(%s)",
+                (user_id, [task_id for _, task_id in deletes])
+            )
+        if updates:
+            await cursor.execute(
+                "UPDATE tasks t SET " + BATCH_UPDATE_SET +
+                " FROM unnest(%s::int[], %s::jsonb[]) AS v(id, patch) WHERE t.id = v.id AND t.user_id = %s",
+                (
+                    [task_id for _, task_id, _ in updates],
+                    [Jsonb(jsonable_encoder(patch)) for _, _, patch in updates],
+                    user_id
+                )
+            )
+        if creates:
+            data = [values for _, values in creates]
+            await cursor.execute("""
+                INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
+                SELECT v.title, v.description, v.status, v.priority, v.due_date, %s, v.category_id
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::int[], %s::date[], %s::int[])
+                     WITH ORDINALITY AS v(title, description, status, priority, due_date, category_id, n)
+                ORDER BY v.n
+                RETURNING id
+            """, (
+                user_id,
+                [d['title'] for d in data],
+                [d['description'] for d in data],
+                [d['status'] for d in data],
+                [d['priority'] for d in data],
+                [d['due_date'] for d in data],
+                [d['category_id'] for d in data]
+            ))
+            for (index, _), row in zip(creates, await cursor.fetchall()):
+                results[index]["id"] = row['id']
+    await db.commit()
+    return results
+
+async def search_tasks(
+    db,
+    search_query: str,
+    limit: int = 100,
+    after: Optional[Tuple] = None,
+    mode: str = "auto"
+) -> List[Dict]:
+    """
+    Пошук задач (повнотекстовий, нечіткий або за підрядком) з ранжуванням;
+    after - ключ (rank, id) останнього рядка попередньої сторінки
+    """
+    query, params = build_search_query(search_query, mode=mode, limit=limit, after=after)
+    async with db.cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+# Час виклику та SQL-запити кожної функції модуля йдуть у метрики
+instrument_module(sys.modules[__name__])
@@ -0,0 +1,95 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from psycopg import AsyncCursor
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from .config import settings
+from .metrics import observe_acquire, observe_query
+
+_pool: Optional[AsyncConnectionPool] = None
+
+
+class TimedCursor(AsyncCursor):
+    """Курсор, що записує тривалість кожного запиту в метрики"""
+
+    async def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await super().execute(*args, **kwargs)
+        except Exception:
+            observe_query(started, failed=True)
+            raise
+        observe_query(started)
+        return result
+
+    async def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await super().executemany(*args, **kwargs)
+        except Exception:
+            observe_query(started, failed=True)
+            raise
+        observe_query(started)
+        return result
+
+
+def _create_pool() -> AsyncConnectionPool:
+    return AsyncConnectionPool(
+        conninfo=make_conninfo(
+            dbname=settings.DB_NAME,
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            options=f"-c app.search_language={settings.SEARCH_LANGUAGE}"
+        ),
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        timeout=settings.DB_POOL_TIMEOUT,
+        max_idle=settings.DB_POOL_MAX_IDLE,
+        check=AsyncConnectionPool.check_connection if settings.DB_POOL_HEALTH_CHECK else None,
+        kwargs={"row_factory": dict_row, "cursor_factory": TimedCursor},
+        open=False
+    )
+
+
+async def open_async_pool() -> AsyncConnectionPool:
+    """Відкриття асинхронного пулу з'єднань (викликається при старті застосунку)"""
+    global _pool
+    if _pool is None:
+        _pool = _create_pool()
+    if _pool.closed:
+        await _pool.open()
+    return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_async_pool_stats() -> Dict:
+    if _pool is None:
+        return {"pool_min": settings.DB_POOL_MIN_SIZE, "pool_max": settings.DB_POOL_MAX_SIZE, "pool_size": 0}
+    return _pool.get_stats()
+
+
+@asynccontextmanager
+async def get_async_db():
+    """Отримання асинхронного з'єднання з пулу"""
+    pool = await open_async_pool()
+    started = time.perf_counter()
+    try:
+        async with pool.connection() as conn:
+            observe_acquire("async", started)
+            yield conn
+    except PoolTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is busy, try again later"
+        )
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Потокобезпечний LRU-кеш з обмеженим розміром та часом життя записів
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class VersionedCache:
+    """
+    Кеш одного значення, який інвалідується збільшенням версії.
+    Значення, завантажене до інвалідації, не потрапляє в кеш
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.version = 0
+        self._value: Any = None
+        self._value_version = -1
+        self._expires_at = 0.0
+        self._observed: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Any:
+        with self._lock:
+            if self._value_version == self.version and (self.ttl is None or self._expires_at >= time.monotonic()):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            return None
+
+    def set(self, value: Any, version: int) -> None:
+        with self._lock:
+            if version != self.version:
+                return
+            self._value = value
+            self._value_version = version
+            if self.ttl is not None:
+                self._expires_at = time.monotonic() + self.ttl
+
+    def bump(self) -> int:
+        with self._lock:
+            self.version += 1
+            self._value = None
+            return self.version
+
+    def observe(self, shared_version: int) -> None:
+        """
+        Звіряє кеш із версією зі спільного сховища (БД): якщо її змінив
+        інший процес, значення скидається, як після bump
+        """
+        with self._lock:
+            if shared_version != self._observed:
+                self._observed = shared_version
+                self.version += 1
+                self._value = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"version": self.version, "hits": self.hits, "misses": self.misses}
+
@@ -1,10 +1,43 @@
-from typing import List, Optional, Dict
+import sys
+from typing import Collection, List, Optional, Dict, Tuple
 from fastapi import HTTPException, status
-from psycopg2.extras import RealDictCursor
+from fastapi.encoders import jsonable_encoder
+from psycopg2 import errors
+from psycopg2.extras import RealDictCursor, Json, execute_values
 from . import schemas
-from .auth import get_password_hash
+from .search import build_search_query
+from .auth import get_password_hash, user_cache
+from .cache import VersionedCache
+from .config import settings
+from .metrics import instrument_module
+from .revocation import revocations
 from .database import get_db
 
+# Кеш списку категорій: версія збільшується при кожній зміні категорій
+category_cache = VersionedCache(ttl=settings.CATEGORY_CACHE_TTL)
+
+# Ключі таблиці data_versions, версії в якій збільшують тригери schema.sql
+CATEGORIES_VERSION_KEY = "categories"
+
+def tasks_version_key(user_id: int) -> str:
+    return "tasks:%s" % user_id
+
+# Видалення користувача залишає позначку для списку відкликання на час дії його токенів
+DELETE_USER_SQL = """
+    WITH deleted AS (
+        DELETE FROM users WHERE id = %s RETURNING id, username
+    ), expired AS (
+        DELETE FROM deleted_users WHERE expires_at <= now()
+    ), tombstone AS (
+        INSERT INTO deleted_users (user_id, expires_at)
+        SELECT id, now() + make_interval(mins => %s) FROM deleted
+    )
+    SELECT username FROM deleted
+"""
+
+# Записи завдань повертаються разом з назвою категорії, як у get_task
+TASK_RETURNING = "RETURNING *, (SELECT c.name FROM categories c WHERE c.id = tasks.category_id) AS category_name"
+
 def get_user(db, user_id: int) -> Optional[Dict]:
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
@@ -21,107 +54,153 @@ def get_users(db) -> List[Dict]:
         return cursor.fetchall()
 
 def create_user(db, user: schemas.UserCreate) -> Dict:
-    existing_user = get_user_by_username(db, user.username)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
-            "INSERT INTO users (username, hashed_password, role) VALUES (%s, %s, %s) RETURNING *",
+            """
+            INSERT INTO users (username, hashed_password, role) VALUES (%s, %s, %s)
+            ON CONFLICT (username) DO NOTHING
+            RETURNING *
+            """,
             (user.username, get_password_hash(user.password), user.role)
         )
         result = cursor.fetchone()
         db.commit()
-        return result
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    return result
 
 def update_user(db, user_id: int, user: schemas.UserUpdate) -> Dict:
-    existing_user = get_user(db, user_id)
-    if not existing_user:
+    # Самооб'єднання повертає попереднє ім'я для інвалідації кешу;
+    # зміна імені чи ролі збільшує покоління, відкликаючи видані токени
+    try:
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                """
+                UPDATE users u SET username = %s, role = COALESCE(%s, u.role),
+                    token_generation = u.token_generation
+                        + CASE WHEN u.username <> %s OR u.role <> COALESCE(%s, u.role) THEN 1 ELSE 0 END
+                FROM users old
+                WHERE u.id = %s AND old.id = u.id
+                RETURNING u.*, old.username AS old_username
+                """,
+                (user.username, user.role, user.username, user.role, user_id)
+            )
+            result = cursor.fetchone()
+            db.commit()
+    except errors.UniqueViolation:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already taken"
+        )
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    if user.username != existing_user['username']:
-        username_exists = get_user_by_username(db, user.username)
-        if username_exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-    
+    user_cache.invalidate(result.pop('old_username'), result['username'])
+    revocations.set_generation(result['id'], result['token_generation'])
+    return result
+
+def delete_user(db, user_id: int) -> None:
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "UPDATE users SET username = %s, role = %s WHERE id = %s RETURNING *",
-            (user.username, user.role, user_id)
-        )
+        cursor.execute(DELETE_USER_SQL, (user_id, settings.ACCESS_TOKEN_EXPIRE_MINUTES))
         result = cursor.fetchone()
         db.commit()
-        return result
-
-def delete_user(db, user_id: int) -> None:
-    existing_user = get_user(db, user_id)
-    if not existing_user:
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    with db.cursor() as cursor:
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-        db.commit()
+    user_cache.invalidate(result['username'])
+    revocations.forget_user(user_id)
+
+def get_data_versions(db, *keys: str) -> Dict[str, int]:
+    """Спільні для всіх процесів версії даних за ключами; ключ без змін має версію 0"""
+    with db.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("SELECT key, version FROM data_versions WHERE key = ANY(%s)", (list(keys),))
+        versions = {row['key']: row['version'] for row in cursor.fetchall()}
+    return {key: versions.get(key, 0) for key in keys}
 
 def get_category(db, category_id: int) -> Optional[Dict]:
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
         return cursor.fetchone()
 
-def get_categories(db) -> List[Dict]:
+def _get_category_snapshot(db) -> Dict:
+    snapshot = category_cache.get()
+    if snapshot is not None:
+        return snapshot
+    version = category_cache.version
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT * FROM categories")
-        return cursor.fetchall()
+        cursor.execute("SELECT * FROM categories ORDER BY id")
+        categories = cursor.fetchall()
+    snapshot = {
+        "list": categories,
+        "names": {category['id']: category['name'] for category in categories}
+    }
+    category_cache.set(snapshot, version)
+    return snapshot
+
+def get_categories(db) -> List[Dict]:
+    return list(_get_category_snapshot(db)["list"])
+
+def category_exists(db, category_id: int) -> bool:
+    return category_id in _get_category_snapshot(db)["names"]
 
 def create_category(db, category: schemas.CategoryCreate) -> Dict:
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
-            "INSERT INTO categories (name) VALUES (%s) RETURNING *",
+            "INSERT INTO categories (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING *",
             (category.name,)
         )
         result = cursor.fetchone()
         db.commit()
-        return result
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category already exists"
+        )
+    category_cache.bump()
+    return result
 
 def update_category(db, category_id: int, category: schemas.CategoryUpdate) -> Dict:
-    existing_category = get_category(db, category_id)
-    if not existing_category:
+    try:
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                "UPDATE categories SET name = %s WHERE id = %s RETURNING *",
+                (category.name, category_id)
+            )
+            result = cursor.fetchone()
+            db.commit()
+    except errors.UniqueViolation:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category already exists"
+        )
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    
-    with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "UPDATE categories SET name = %s WHERE id = %s RETURNING *",
-            (category.name, category_id)
-        )
-        result = cursor.fetchone()
-        db.commit()
-        return result
+    category_cache.bump()
+    return result
 
 def delete_category(db, category_id: int) -> None:
-    existing_category = get_category(db, category_id)
-    if not existing_category:
+    with db.cursor() as cursor:
+        cursor.execute("DELETE FROM categories WHERE id = %s RETURNING id", (category_id,))
+        deleted = cursor.fetchone()
+        db.commit()
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    
-    with db.cursor() as cursor:
-        cursor.execute("DELETE FROM categories WHERE id = %s", (category_id,))
-        db.commit()
+    category_cache.bump()
 
 def get_task(db, task_id: int) -> Optional[Dict]:
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -133,129 +212,261 @@ def get_task(db, task_id: int) -> Optional[Dict]:
         """, (task_id,))
         return cursor.fetchone()
 
-def get_tasks(db, user_id: int) -> List[Dict]:
+def get_tasks(
+    db,
+    user_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple] = None
+) -> List[Dict]:
+    """
+    Завдання користувача в порядку id; after - ключ (id,) останнього
+    рядка попередньої сторінки (keyset-пагінація)
+    """
+    query = """
+        SELECT t.*, c.name as category_name 
+        FROM tasks t 
+        LEFT JOIN categories c ON t.category_id = c.id 
+        WHERE t.user_id = %s
+    """
+    params = [user_id]
+    if after:
+        query += " AND t.id > %s"
+        params.append(after[0])
+    query += " ORDER BY t.id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+def iter_tasks(db, user_id: int, batch_size: int = 500):
+    """
+    Ітерує всі завдання користувача через серверний курсор,
+    отримуючи рядки пачками по batch_size
+    """
+    with db.cursor(name="tasks_stream", cursor_factory=RealDictCursor) as cursor:
+        cursor.itersize = batch_size
         cursor.execute("""
             SELECT t.*, c.name as category_name 
             FROM tasks t 
             LEFT JOIN categories c ON t.category_id = c.id 
             WHERE t.user_id = %s
+            ORDER BY t.id
         """, (user_id,))
-        return cursor.fetchall()
+        for row in cursor:
+            yield row
 
 def create_task(db, task: schemas.TaskCreate, user_id: int) -> Dict:
-    category = get_category(db, task.category_id)
-    if not category:
+    # Існування категорії перевіряє зовнішній ключ
+    try:
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """ + TASK_RETURNING, (
+                task.title,
+                task.description,
+                task.status,
+                task.priority,
+                task.due_date,
+                user_id,
+                task.category_id
+            ))
+            result = cursor.fetchone()
+            db.commit()
+    except errors.ForeignKeyViolation:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    
-    with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("""
-            INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING *
-        """, (
-            task.title,
-            task.description,
-            task.status,
-            task.priority,
-            task.due_date,
-            user_id,
-            task.category_id
-        ))
-        result = cursor.fetchone()
-        db.commit()
-        return result
+    return result
 
 def update_task(db, task_id: int, task: schemas.TaskUpdate, user_id: int) -> Dict:
-    existing_task = get_task(db, task_id)
-    if not existing_task or existing_task['user_id'] != user_id:
+    # Незаповнені обов'язкові поля (title, status, priority, category_id) лишаються без змін
+    try:
+        with db.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                UPDATE tasks
+                SET title = COALESCE(%s, title), description = %s, status = COALESCE(%s, status),
+                    priority = COALESCE(%s::varchar, priority), due_date = %s,
+                    category_id = COALESCE(%s, category_id)
+                WHERE id = %s AND user_id = %s
+            """ + TASK_RETURNING, (
+                task.title,
+                task.description,
+                task.status,
+                task.priority,
+                task.due_date,
+                task.category_id,
+                task_id,
+                user_id
+            ))
+            result = cursor.fetchone()
+            db.commit()
+    except errors.ForeignKeyViolation:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
+            detail="Category not found"
         )
-    
-    category = get_category(db, task.category_id)
-    if not category:
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
+            detail="Task not found"
         )
-    
-    with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("""
-            UPDATE tasks 
-            SET title = %s, description = %s, status = %s, priority = %s, 
-                due_date = %s, category_id = %s
-            WHERE id = %s AND user_id = %s
-            RETURNING *
-        """, (
-            task.title,
-            task.description,
-            task.status,
-            task.priority,
-            task.due_date,
-            task.category_id,
-            task_id,
-            user_id
-        ))
-        result = cursor.fetchone()
-        db.commit()
-        return result
+    return result
 
 def delete_task(db, task_id: int, user_id: int) -> None:
-    existing_task = get_task(db, task_id)
-    if not existing_task or existing_task['user_id'] != user_id:
+    with db.cursor() as cursor:
+        cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s RETURNING id", (task_id, user_id))
+        deleted = cursor.fetchone()
+        db.commit()
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
-    
-    with db.cursor() as cursor:
-        cursor.execute("DELETE FROM tasks WHERE id = %s AND user_id = %s", (task_id, user_id))
-        db.commit()
 
-def search_tasks(db, search_query: str, skip: int = 0, limit: int = 100) -> List[Dict]:
+# Поля, які не можна обнулити при оновленні
+_REQUIRED_TASK_FIELDS = ("title", "category_id", "status", "priority")
+
+# Часткове оновлення з пакета: patch містить лише передані поля
+BATCH_UPDATE_SET = """
+    title = CASE WHEN v.patch ? 'title' THEN v.patch->>'title' ELSE t.title END,
+    description = CASE WHEN v.patch ? 'description' THEN v.patch->>'description' ELSE t.description END,
+    status = CASE WHEN v.patch ? 'status' THEN v.patch->>'status' ELSE t.status END,
+    priority = CASE WHEN v.patch ? 'priority' THEN v.patch->>'priority' ELSE t.priority END,
+    due_date = CASE WHEN v.patch ? 'due_date' THEN (v.patch->>'due_date')::date ELSE t.due_date END,
+    category_id = CASE WHEN v.patch ? 'category_id' THEN (v.patch->>'category_id')::int ELSE t.category_id END
+"""
+
+def plan_task_batch(
+    operations: List[schemas.TaskBatchOperation],
+    owned_ids: Collection[int],
+    category_ids: Collection[int]
+) -> Tuple[List[Dict], List[Tuple[int, Dict]], List[Tuple[int, int, Dict]], List[Tuple[int, int]]]:
+    """
+    Перевіряє операції пакета без звернень до БД (власність завдань і категорії
+    вже завантажені). Повертає результати всіх операцій та коректні
+    створення (index, дані), оновлення (index, id, patch) і видалення (index, id)
+    """
+    results, creates, updates, deletes = [], [], [], []
+    seen = set()
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation.op, "status": None, "id": operation.id, "error": None}
+        results.append(result)
+        data = operation.task.model_dump(exclude_unset=True) if operation.task else {}
+
+        if operation.op == "create":
+            if data.get("title") is None or data.get("category_id") is None:
+                result.update(status=422, error="title and category_id are required")
+                continue
+            data = schemas.TaskCreate(**data).model_dump()
+        else:
+            if operation.id is None:
+                result.update(status=422, error="id is required")
+                continue
+            if operation.id in seen:
+                result.update(status=409, error="Duplicate id in batch")
+                continue
+            seen.add(operation.id)
+            if operation.id not in owned_ids:
+                result.update(status=404, error="Task not found")
+                continue
+            if operation.op == "delete":
+                result["status"] = 204
+                deletes.append((index, operation.id))
+                continue
+            if not data:
+                result.update(status=422, error="Nothing to update")
+                continue
+            nulls = [field for field in _REQUIRED_TASK_FIELDS if field in data and data[field] is None]
+            if nulls:
+                result.update(status=422, error="%s cannot be null" % ", ".join(nulls))
+                continue
+
+        if "category_id" in data and data["category_id"] not in category_ids:
+            result.update(status=404, error="Category not found")
+            continue
+        if operation.op == "create":
+            result["status"] = 201
+            creates.append((index, data))
+        else:
+            result["status"] = 200
+            updates.append((index, operation.id, data))
+    return results, creates, updates, deletes
+
+def batch_tasks(db, user_id: int, operations: List[schemas.TaskBatchOperation]) -> List[Dict]:
+    """
+    Виконує пакет операцій над завданнями в одній транзакції:
+    по одному запиту на кожен вид операцій незалежно від розміру пакета
+    """
+    ids = [operation.id for operation in operations if operation.op != "create" and operation.id is not None]
+    owned = set()
     with db.cursor(cursor_factory=RealDictCursor) as cursor:
-        if not search_query:
-            query = """
-            SELECT t.*, 
-                   c.name as category_name,
-                   1 as rank
-            FROM tasks t
-            LEFT JOIN categories c ON t.category_id = c.id
-            ORDER BY t.id DESC
-            LIMIT %s OFFSET %s
-            """
-            cursor.execute(query, (limit, skip))
-            return cursor.fetchall()
-        
-        search_pattern = f"%{search_query}%"
-        
-        query = """
-        SELECT DISTINCT t.*, 
-               c.name as category_name,
-               CASE 
-                   WHEN t.title ILIKE %s THEN 1
-                   WHEN t.description ILIKE %s THEN 0.5
-                   ELSE 0
-               END as rank
-        FROM tasks t
-        LEFT JOIN categories c ON t.category_id = c.id
-        WHERE t.title ILIKE %s 
-           OR (t.description IS NOT NULL AND t.description ILIKE %s)
-        ORDER BY rank DESC, t.id DESC
-        LIMIT %s OFFSET %s
-        """
-        
-        cursor.execute(query, (
-            search_pattern,
-            search_pattern,
-            search_pattern,
-            search_pattern,
-            limit,
-            skip
-        ))
-        return cursor.fetchall()
\ No newline at end of file
+        if ids:
+            cursor.execute(
+                "SELECT id FROM tasks WHERE user_id = %s AND id = ANY(%s) FOR UPDATE",
+                (user_id, ids)
+            )
+            owned = {row['id'] for row in cursor.fetchall()}
+    category_ids = _get_category_snapshot(db)["names"]
+    results, creates, updates, deletes = plan_task_batch(operations, owned, category_ids)
+
+    with db.cursor(cursor_factory=RealDictCursor) as cursor:
+        if deletes:
+            cursor.execute(
+                "DELETE FROM tasks WHERE user_id = %s AND id = ANY(%s)",
+                (user_id, [task_id for _, task_id in deletes])
+            )
+        if updates:
+            execute_values(
+                cursor,
+                "UPDATE tasks t SET " + BATCH_UPDATE_SET +
+                " FROM (VALUES %s) AS v(id, patch, user_id) WHERE t.id = v.id AND t.user_id = v.user_id",
+                [(task_id, Json(jsonable_encoder(patch)), user_id) for _, task_id, patch in updates],
+                template="(%s, %s::jsonb, %s)",
+                page_size=len(updates)
+            )
+        if creates:
+            rows = execute_values(
+                cursor,
+                """
+                INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
+                VALUES %s
+                RETURNING id
+                """,
+                [
+                    (data['title'], data['description'], data['status'], data['priority'],
+                     data['due_date'], user_id, data['category_id'])
+                    for _, data in creates
+                ],
+                page_size=len(creates),
+                fetch=True
+            )
+            for (index, _), row in zip(creates, rows):
+                results[index]["id"] = row['id']
+    db.commit()
+    return results
+
+def search_tasks(
+    db,
+    search_query: str,
+    limit: int = 100,
+    after: Optional[Tuple] = None,
+    mode: str = "auto"
+) -> List[Dict]:
+    """
+    Пошук задач (повнотекстовий, нечіткий або за підрядком) з ранжуванням;
+    after - ключ (rank, id) останнього рядка попередньої сторінки
+    """
+    query, params = build_search_query(search_query, mode=mode, limit=limit, after=after)
+    with db.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+# Час виклику та SQL-запити кожної функції модуля йдуть у метрики
+instrument_module(sys.modules[__name__])
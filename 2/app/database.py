@@ -1,21 +1,262 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
+from psycopg2.pool import PoolError
+from fastapi import HTTPException, status
 from .config import settings
+from .metrics import observe_acquire
+
+
+class PoolTimeout(PoolError):
+    """Не вдалося отримати з'єднання з пулу за відведений час"""
+
+
+class ConnectionPool:
+    """
+    Потокобезпечний пул з'єднань psycopg2 з обмеженням розміру,
+    таймаутом очікування, часом життя простою та перевіркою з'єднання при видачі
+    """
+
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        timeout: float,
+        max_idle: float,
+        health_check: bool,
+        **connect_kwargs
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: min=%s, max=%s" % (minconn, maxconn))
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check = health_check
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = set()
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._created = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+        self._created = len(self._idle)
+
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+
+    def _discard(self, conn) -> None:
+        # Лічильники змінюються лише під self._cond
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Видає з'єднання з пулу, очікуючи не довше за timeout секунд"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+
+                self._expire_idle()
+                conn = self._idle.pop()[0] if self._idle else None
+
+                if conn is None and len(self._in_use) + self._opening < self.maxconn:
+                    self._opening += 1
+                    self._cond.release()
+                    try:
+                        conn = self._connect()
+                    finally:
+                        self._cond.acquire()
+                        self._opening -= 1
+                    self._created += 1
+                    # Свіже з'єднання не потребує перевірки
+                    self._checkout(conn, started)
+                    return conn
+
+                if conn is not None:
+                    self._in_use.add(conn)
+                    self._cond.release()
+                    try:
+                        healthy = self._is_healthy(conn)
+                    finally:
+                        self._cond.acquire()
+                        self._in_use.discard(conn)
+                    if not healthy:
+                        self._discard(conn)
+                        continue
+                    self._checkout(conn, started)
+                    return conn
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        "could not acquire a connection within %.1f seconds" % self.timeout
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _expire_idle(self) -> None:
+        """
+        Закриває з'єднання, що простояли довше за max_idle (понад minconn).
+        Видається найсвіжіше з'єднання праворуч, тож найстаріші накопичуються ліворуч
+        """
+        if not self.max_idle:
+            return
+        expire_before = time.monotonic() - self.max_idle
+        while (
+            self._idle and self._idle[0][1] < expire_before
+            and len(self._idle) + len(self._in_use) + self._opening > self.minconn
+        ):
+            self._discard(self._idle.popleft()[0])
+
+    def _checkout(self, conn, started: float) -> None:
+        waited = time.monotonic() - started
+        self._in_use.add(conn)
+        self._acquired += 1
+        self._wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """Повертає з'єднання в пул, відкочуючи незавершену транзакцію"""
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._expire_idle()
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "created": self._created,
+                "discarded": self._discarded,
+                "timeouts": self._timeouts,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_avg": round(self._wait_time / self._acquired, 6) if self._acquired else 0.0,
+                "wait_time_max": round(self._max_wait_time, 6),
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Ледаче створення пулу з'єднань для поточного процесу"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=settings.DB_POOL_MIN_SIZE,
+                    maxconn=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_idle=settings.DB_POOL_MAX_IDLE,
+                    health_check=settings.DB_POOL_HEALTH_CHECK,
+                    dbname=settings.DB_NAME,
+                    user=settings.DB_USER,
+                    password=settings.DB_PASSWORD,
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                    options=f"-c app.search_language={settings.SEARCH_LANGUAGE}",
+                    cursor_factory=RealDictCursor
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_pool_stats() -> Dict:
+    if _pool is None:
+        return {"min_size": settings.DB_POOL_MIN_SIZE, "max_size": settings.DB_POOL_MAX_SIZE, "in_use": 0, "idle": 0}
+    return _pool.stats()
 
 
 @contextmanager
 def get_db():
-    """Получение соединения с базой данных"""
-    conn = psycopg2.connect(
-        dbname=settings.DB_NAME,
-        user=settings.DB_USER,
-        password=settings.DB_PASSWORD,
-        host=settings.DB_HOST,
-        port=settings.DB_PORT,
-        cursor_factory=RealDictCursor
-    )
+    """Отримання з'єднання з пулу"""
+    pool = get_pool()
+    started = time.perf_counter()
+    try:
+        conn = pool.getconn()
+    except PoolTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is busy, try again later"
+        )
+    observe_acquire("sync", started)
+    broken = False
     try:
         yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
     finally:
-        conn.close() 
\ No newline at end of file
+        pool.putconn(conn, close=broken)
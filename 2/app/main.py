@@ -1,10 +1,15 @@
-from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from .database import get_db
-from .routers import auth, tasks, categories, users
-from .auth import get_current_user_optional
+from fastapi import FastAPI, Request, Depends, HTTPException, status
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from .database import get_pool_stats, close_pool
+from .async_database import open_async_pool, close_async_pool, get_async_pool_stats
+from .config import settings
+from .routers import auth, tasks, categories, users, api
+from .auth import get_current_user, get_current_user_optional, setup_password_hasher, shutdown_password_hasher
+from .assets import StaticAssets, build_assets
+from .compression import CompressionMiddleware
+from .sessions import SessionRenewalMiddleware
+from .metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, host_allowed, render_metrics
+from .templating import templates, compile_templates
 
 app = FastAPI(
     title="Task Manager",
@@ -22,13 +27,54 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(SessionRenewalMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Файли з хешем вмісту та стиснуті варіанти збираються до монтування
+build_assets()
+app.mount("/static", StaticAssets(), name="static")
 
 app.include_router(auth.router, tags=["Аутентифікація"])
 app.include_router(tasks.router, tags=["Завдання"])
 app.include_router(categories.router, tags=["Категорії"])
 app.include_router(users.router, tags=["Користувачі"])
+app.include_router(api.router)
+
+@app.on_event("startup")
+async def startup_pool():
+    compile_templates()
+    setup_password_hasher()
+    await open_async_pool()
+
+@app.on_event("shutdown")
+async def shutdown_pool():
+    await close_async_pool()
+    close_pool()
+    shutdown_password_hasher()
+
+@app.get("/api/db/pool", summary="Статистика пулу з'єднань")
+async def db_pool_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Поточний стан пулу з'єднань з базою даних цього процесу:
+    зайняті та вільні з'єднання, кількість очікувань і час очікування
+    (тільки для адміністраторів)
+    """
+    if current_user['role'] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    return {"async": get_async_pool_stats(), "sync": get_pool_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Метрики Prometheus цього процесу (лише для адрес з METRICS_ALLOWED_HOSTS)
+    """
+    if not host_allowed(request.client.host if request.client else None, settings.METRICS_ALLOWED_HOSTS):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request, current_user: dict = Depends(get_current_user_optional)):
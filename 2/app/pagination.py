@@ -0,0 +1,59 @@
+import base64
+import json
+import math
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """Кодує ключ останнього рядка сторінки в непрозорий курсор"""
+    values = [float(v) if isinstance(v, Decimal) else v for v in values]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Типи значень ключа курсора: id для списків, (rank, id) для пошуку
+ID_KEY = (int,)
+RANK_KEY = (float, int)
+
+
+def _matches(value: Any, expected: type) -> bool:
+    # bool - підклас int, але ключем бути не може
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: Optional[str], key_types: Tuple[type, ...]) -> Optional[Tuple]:
+    """Розбирає курсор; ключ має збігатися з key_types за довжиною та типами"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if (
+            not isinstance(values, list)
+            or len(values) != len(key_types)
+            or not all(map(_matches, values, key_types))
+        ):
+            raise ValueError(cursor)
+        return tuple(values)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def split_page(rows: List, limit: int, key: Callable[[Any], Tuple]) -> Tuple[List, Optional[str]]:
+    """
+    Відрізає зайвий рядок (запит робиться з limit + 1)
+    і повертає сторінку та курсор наступної сторінки
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from .async_database import get_async_db
+from .config import settings
+
+# Позначка видаленого користувача в карті поколінь
+DELETED = None
+
+
+class RevocationList:
+    """
+    Стан відкликання токенів у пам'яті процесу: покоління токенів користувачів,
+    у яких воно змінювалось (решта мають покоління 0), видалені користувачі,
+    чиї токени ще діють, та відкликані jti (вихід із системи).
+    З БД перечитується не частіше ніж раз на refresh_interval секунд, тож зміни
+    з інших процесів застосовуються із цією затримкою; зміни цього процесу - одразу
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._generations: Dict[int, Optional[int]] = {}
+        self._revoked: Dict[str, float] = {}
+        # Зміни цього процесу від початку поточного оновлення: запит міг їх не побачити
+        self._pending_generations: Dict[int, Optional[int]] = {}
+        self._pending_revoked: Dict[str, float] = {}
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    async def _refresh(self) -> None:
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh_interval:
+                return
+            self._pending_generations, self._pending_revoked = {}, {}
+            async with get_async_db() as db:
+                async with db.cursor() as cursor:
+                    # Частковий індекс users_token_generation_idx: рядки з поколінням 0 не читаються
+                    await cursor.execute("SELECT id, token_generation FROM users WHERE token_generation > 0")
+                    generations = {row['id']: row['token_generation'] for row in await cursor.fetchall()}
+                    await cursor.execute("SELECT user_id FROM deleted_users WHERE expires_at > now()")
+                    generations.update((row['user_id'], DELETED) for row in await cursor.fetchall())
+                    await cursor.execute(
+                        "SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > now()"
+                    )
+                    revoked = {row['jti']: row['expires_at'].timestamp() for row in await cursor.fetchall()}
+            self._generations = {**generations, **self._pending_generations}
+            self._revoked = {**revoked, **self._pending_revoked}
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    async def is_valid(self, user_id: int, generation: int, jti: Optional[str]) -> bool:
+        await self._refresh()
+        if jti is not None and self._revoked.get(jti, 0) > time.time():
+            return False
+        current = self._generations.get(user_id, 0)
+        # Токен, виданий іншим процесом після зміни, може мати покоління новіше за відоме тут
+        return current is not DELETED and generation >= current
+
+    def set_generation(self, user_id: int, generation: Optional[int]) -> None:
+        self._generations[user_id] = self._pending_generations[user_id] = generation
+
+    def forget_user(self, user_id: int) -> None:
+        self.set_generation(user_id, DELETED)
+
+    async def revoke(self, jti: str, expires_at: datetime) -> None:
+        """Відкликання одного токена до закінчення його терміну дії"""
+        self._revoked[jti] = self._pending_revoked[jti] = expires_at.timestamp()
+        async with get_async_db() as db:
+            async with db.cursor() as cursor:
+                await cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= now()")
+                await cursor.execute(
+                    "INSERT INTO revoked_tokens (jti, expires_at) VALUES (%s, %s) ON CONFLICT (jti) DO NOTHING",
+                    (jti, expires_at)
+                )
+            await db.commit()
+
+    def stats(self) -> Dict:
+        return {
+            "users": len(self._generations),
+            "revoked": sum(1 for expires_at in self._revoked.values() if expires_at > time.time()),
+            "refreshes": self.refreshes,
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+revocations = RevocationList(refresh_interval=settings.TOKEN_REVOCATION_REFRESH)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
+from fastapi import APIRouter, Request, Depends, HTTPException, status, Form, Cookie
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from .. import schemas, crud, auth
-from ..database import get_db
+from .. import schemas, async_crud, auth, sessions
+from ..async_database import get_async_db
+from ..config import settings
+from ..ratelimit import login_guard
+from ..templating import templates
 
 router = APIRouter(
     prefix="/auth",
@@ -10,8 +12,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("/login", response_class=HTMLResponse, summary="Сторінка входу")
 async def login_page(request: Request):
     """
@@ -26,17 +26,18 @@ async def login(request: Request, username: str = Form(...), password: str = For
     - **username**: ім'я користувача
     - **password**: пароль користувача
     """
-    with get_db() as db:
-        user = auth.authenticate_user(db, username, password)
+    # Спроба допускається до того, як займе з'єднання з пулу
+    async with login_guard.attempt(request, username), get_async_db() as db:
+        user = await auth.authenticate_user(db, username, password)
         if not user:
             return templates.TemplateResponse(
                 "login.html",
                 {"request": request, "error": "Invalid username or password"}
             )
-        access_token = auth.create_access_token(data={"sub": user['username']})
-        response = RedirectResponse(url="/tasks", status_code=303)
-        response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True)
-        return response
+        access_token, refresh_token = await sessions.start_session(db, user)
+    response = RedirectResponse(url="/tasks", status_code=303)
+    sessions.set_session_cookies(response, access_token, refresh_token)
+    return response
 
 @router.get("/register", response_class=HTMLResponse, summary="Сторінка реєстрації")
 async def register_page(request: Request):
@@ -59,8 +60,13 @@ async def register(
     - **role**: роль користувача (за замовчуванням "user")
     """
     try:
-        with get_db() as db:
-            user = crud.create_user(db, schemas.UserCreate(username=username, password=password, role=role))
+        async with get_async_db() as db:
+            hashed_password = await auth.hash_new_password(db, username, password)
+            user = await async_crud.create_user(
+                db,
+                schemas.UserCreate(username=username, password=password, role=role),
+                hashed_password=hashed_password
+            )
             return RedirectResponse(url="/auth/login", status_code=303)
     except HTTPException as e:
         return templates.TemplateResponse(
@@ -69,10 +75,18 @@ async def register(
         )
 
 @router.get("/logout", summary="Вихід з системи")
-async def logout():
+async def logout(
+    access_token: str = Cookie(None, alias="access_token"),
+    refresh_token: str = Cookie(None, alias="refresh_token")
+):
     """
-    Вихід з системи та видалення токена доступу
+    Вихід з системи: завершення сесії та видалення токенів
     """
+    if settings.AUTH_STATELESS:
+        await auth.revoke_access_token(access_token)
+    if refresh_token:
+        async with get_async_db() as db:
+            await sessions.end_session(db, refresh_token)
     response = RedirectResponse(url="/auth/login", status_code=303)
-    response.delete_cookie("access_token")
+    sessions.clear_session_cookies(response)
     return response 
\ No newline at end of file
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from typing import Dict
-from .. import schemas, crud, auth
-from ..database import get_db
+from .. import schemas, async_crud, auth
+from ..async_database import get_async_db
+from ..crud import CATEGORIES_VERSION_KEY, category_cache
+from ..etag import make_etag, is_not_modified, not_modified, set_etag
+from ..templating import templates
 
 router = APIRouter(
     prefix="/categories",
@@ -11,8 +13,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("", response_class=HTMLResponse, summary="Список категорій")
 async def categories_page(
     request: Request,
@@ -31,12 +31,18 @@ async def categories_page(
                 "error": "Insufficient permissions"
             }
         )
-    with get_db() as db:
-        categories = crud.get_categories(db)
-        return templates.TemplateResponse(
+    async with get_async_db() as db:
+        version = (await async_crud.get_data_versions(db, CATEGORIES_VERSION_KEY))[CATEGORIES_VERSION_KEY]
+        category_cache.observe(version)
+        etag = make_etag("categories", current_user['id'], current_user['username'], version)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        categories = await async_crud.get_categories(db)
+        response = templates.TemplateResponse(
             "categories.html",
             {"request": request, "current_user": current_user, "categories": categories}
         )
+        return set_etag(response, etag)
 
 @router.post("", summary="Створення нової категорії")
 async def create_category(
@@ -59,12 +65,12 @@ async def create_category(
             }
         )
     try:
-        with get_db() as db:
-            crud.create_category(db, schemas.CategoryCreate(name=name))
+        async with get_async_db() as db:
+            await async_crud.create_category(db, schemas.CategoryCreate(name=name))
             return RedirectResponse(url="/categories", status_code=303)
     except HTTPException as e:
-        with get_db() as db:
-            categories = crud.get_categories(db)
+        async with get_async_db() as db:
+            categories = await async_crud.get_categories(db)
             return templates.TemplateResponse(
                 "categories.html",
                 {
@@ -98,12 +104,12 @@ async def update_category(
             }
         )
     try:
-        with get_db() as db:
-            crud.update_category(db, category_id, schemas.CategoryUpdate(name=name))
+        async with get_async_db() as db:
+            await async_crud.update_category(db, category_id, schemas.CategoryUpdate(name=name))
             return RedirectResponse(url="/categories", status_code=303)
     except HTTPException as e:
-        with get_db() as db:
-            categories = crud.get_categories(db)
+        async with get_async_db() as db:
+            categories = await async_crud.get_categories(db)
             return templates.TemplateResponse(
                 "categories.html",
                 {
@@ -134,6 +140,6 @@ async def delete_category(
                 "error": "Insufficient permissions"
             }
         )
-    with get_db() as db:
-        crud.delete_category(db, category_id)
+    async with get_async_db() as db:
+        await async_crud.delete_category(db, category_id)
         return RedirectResponse(url="/categories", status_code=303) 
\ No newline at end of file
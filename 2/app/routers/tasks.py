@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, HTTPException, status, Form, Query, UploadFile, File
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from typing import Optional, Dict
 from datetime import datetime
-from .. import schemas, crud, auth
-from ..database import get_db
+from .. import schemas, async_crud, auth
+from ..async_database import get_async_db
+from ..config import settings
+from ..crud import CATEGORIES_VERSION_KEY, category_cache, tasks_version_key
+from ..etag import make_etag, is_not_modified, not_modified, set_etag
+from ..pagination import ID_KEY, RANK_KEY, decode_cursor, split_page
+from ..transfer import CHUNK_SIZE, detect_format, export_tasks, import_tasks
+from ..templating import templates, stream_templates
 
 router = APIRouter(
     prefix="/tasks",
@@ -12,7 +17,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
+# Мінімальний розмір фрагмента HTML, що відправляється клієнту
+STREAM_CHUNK_SIZE = 16 * 1024
 
 PRIORITY_MAP = {
     "low": 1,
@@ -20,39 +26,102 @@ PRIORITY_MAP = {
     "high": 5
 }
 
+async def _stream_tasks_page(context: Dict, user_id: int):
+    """
+    Рендерить tasks.html частинами: шапка сторінки відправляється одразу,
+    а рядки таблиці - у міру читання з серверного курсора
+    """
+    template = stream_templates.get_template("tasks.html")
+    async with get_async_db() as db:
+        context["tasks"] = async_crud.iter_tasks(db, user_id)
+        buffer, size = [], 0
+        async for chunk in template.generate_async(context):
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
 @router.get("", response_class=HTMLResponse, summary="Список завдань")
 async def tasks_page(
     request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.TASKS_PAGE_SIZE, ge=1, le=settings.TASKS_PAGE_SIZE_MAX),
+    stream: bool = False,
     current_user: Dict = Depends(auth.get_current_user)
 ):
     """
-    Відображає сторінку зі списком завдань користувача
+    Відображає сторінку зі списком завдань користувача:
+    - **cursor**: курсор наступної сторінки
+    - **limit**: кількість завдань на сторінці
+    - **stream**: показати всі завдання, рендерячи сторінку потоково
     """
-    with get_db() as db:
-        tasks = crud.get_tasks(db, current_user['id'])
-        categories = crud.get_categories(db)
-        return templates.TemplateResponse(
+    if stream:
+        async with get_async_db() as db:
+            categories = await async_crud.get_categories(db)
+        context = {
+            "request": request,
+            "current_user": current_user,
+            "categories": categories
+        }
+        return StreamingResponse(
+            _stream_tasks_page(context, current_user['id']),
+            media_type="text/html; charset=utf-8"
+        )
+
+    after = decode_cursor(cursor, ID_KEY)
+    async with get_async_db() as db:
+        # Версії читаються до запитів: зміна під час рендерингу дасть новий ETag
+        task_key = tasks_version_key(current_user['id'])
+        versions = await async_crud.get_data_versions(db, task_key, CATEGORIES_VERSION_KEY)
+        category_cache.observe(versions[CATEGORIES_VERSION_KEY])
+        etag = make_etag(
+            "tasks", current_user['id'], current_user['username'], current_user['role'],
+            versions[task_key], versions[CATEGORIES_VERSION_KEY], cursor, limit
+        )
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
+        tasks = await async_crud.get_tasks(db, current_user['id'], limit=limit + 1, after=after)
+        tasks, next_cursor = split_page(tasks, limit, key=lambda t: (t['id'],))
+        categories = await async_crud.get_categories(db)
+        response = templates.TemplateResponse(
             "tasks.html",
             {
                 "request": request,
                 "current_user": current_user,
                 "tasks": tasks,
-                "categories": categories
+                "categories": categories,
+                "cursor": cursor,
+                "next_cursor": next_cursor,
+                "limit": limit
             }
         )
+        return set_etag(response, etag)
 
 @router.get("/search", response_class=HTMLResponse, summary="Поиск задач")
 async def search_tasks_page(
     request: Request,
     search_query: str = "",
+    mode: str = Query("auto", pattern="^(auto|fts|fuzzy|substring)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.TASKS_PAGE_SIZE, ge=1, le=settings.TASKS_PAGE_SIZE_MAX),
     current_user: Dict = Depends(auth.get_current_user)
 ):
     """
-    Пошук задач по назві та опису
+    Пошук задач по назві та опису:
+    - **search_query**: пошуковий запит ("фраза", префікс*)
+    - **mode**: auto, fts (повнотекстовий), fuzzy (нечіткий), substring (підрядок)
+    - **cursor**: курсор наступної сторінки
+    - **limit**: кількість завдань на сторінці
     """
-    with get_db() as db:
-        tasks = crud.search_tasks(db, search_query)
-        categories = crud.get_categories(db)
+    after = decode_cursor(cursor, RANK_KEY)
+    async with get_async_db() as db:
+        tasks = await async_crud.search_tasks(db, search_query, limit=limit + 1, after=after, mode=mode)
+        tasks, next_cursor = split_page(tasks, limit, key=lambda t: (t['rank'], t['id']))
+        categories = await async_crud.get_categories(db)
         return templates.TemplateResponse(
             "tasks.html",
             {
@@ -60,10 +129,65 @@ async def search_tasks_page(
                 "current_user": current_user,
                 "tasks": tasks,
                 "categories": categories,
-                "search_query": search_query
+                "search_query": search_query,
+                "search_mode": mode,
+                "cursor": cursor,
+                "next_cursor": next_cursor,
+                "limit": limit
             }
         )
 
+async def _stream_export(user_id: int, fmt: str):
+    async with get_async_db() as db:
+        async for chunk in export_tasks(db, user_id, fmt):
+            yield chunk
+
+@router.get("/export", summary="Експорт завдань")
+async def export_tasks_file(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: Dict = Depends(auth.get_current_user)
+):
+    """
+    Вивантаження всіх завдань користувача (потоково, через COPY):
+    - **format**: csv або ndjson
+    """
+    return StreamingResponse(
+        _stream_export(current_user['id'], format),
+        media_type="text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="tasks.%s"' % format}
+    )
+
+@router.post("/import", summary="Імпорт завдань")
+async def import_tasks_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: Dict = Depends(auth.get_current_user)
+):
+    """
+    Масовий імпорт завдань з файлу у форматі експорту:
+    - **file**: CSV із заголовком id,title,description,status,priority,due_date,category_id,category_name
+      або NDJSON з тими ж ключами
+    - **format**: csv або ndjson (за замовчуванням - за розширенням файлу)
+
+    Рядки з id існуючого завдання оновлюють його, решта створюють нові завдання.
+    Повертає кількість створених і оновлених завдань та звіт про помилкові рядки
+    """
+    async def chunks():
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    async with get_async_db() as db:
+        return await import_tasks(
+            db,
+            current_user['id'],
+            chunks(),
+            format or detect_format(file.filename),
+            error_limit=settings.TASKS_IMPORT_ERROR_LIMIT
+        )
+
 @router.post("", summary="Створення нового завдання")
 async def create_task(
     request: Request,
@@ -96,8 +220,8 @@ async def create_task(
             due_date=datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
         )
         
-        with get_db() as db:
-            task = crud.create_task(db, task_data, current_user['id'])
+        async with get_async_db() as db:
+            task = await async_crud.create_task(db, task_data, current_user['id'])
             return RedirectResponse(url="/tasks", status_code=303)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -127,13 +251,9 @@ async def update_task(
     - **due_date**: термін виконання (YYYY-MM-DD)
     """
     try:
-        with get_db() as db:
-            task = crud.get_task(db, task_id)
-            if not task or task['user_id'] != current_user['id']:
-                raise HTTPException(status_code=404, detail="Task not found")
-            
-            priority_value = PRIORITY_MAP.get(priority.lower(), task['priority']) if priority else task['priority']
-            
+        # Невідомий або не переданий пріоритет лишається без змін
+        priority_value = PRIORITY_MAP.get(priority.lower()) if priority else None
+        async with get_async_db() as db:
             task_data = schemas.TaskUpdate(
                 title=title,
                 description=description,
@@ -142,7 +262,7 @@ async def update_task(
                 priority=priority_value,
                 due_date=datetime.strptime(due_date, "%Y-%m-%d") if due_date else None
             )
-            crud.update_task(db, task_id, task_data, current_user['id'])
+            await async_crud.update_task(db, task_id, task_data, current_user['id'])
             return RedirectResponse(url="/tasks", status_code=303)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -159,11 +279,8 @@ async def delete_task(
     - **task_id**: ID завдання для видалення
     """
     try:
-        with get_db() as db:
-            task = crud.get_task(db, task_id)
-            if not task or task['user_id'] != current_user['id']:
-                raise HTTPException(status_code=404, detail="Task not found")
-            crud.delete_task(db, task_id, current_user['id'])
+        async with get_async_db() as db:
+            await async_crud.delete_task(db, task_id, current_user['id'])
             return RedirectResponse(url="/tasks", status_code=303)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, status, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from typing import Dict
-from .. import schemas, crud, auth
-from ..database import get_db
+from .. import schemas, async_crud, auth
+from ..async_database import get_async_db
+from ..templating import templates
 
 router = APIRouter(
     prefix="/users",
@@ -11,8 +11,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-templates = Jinja2Templates(directory="app/templates")
-
 @router.get("", response_class=HTMLResponse, summary="Список користувачів")
 async def users_page(
     request: Request,
@@ -31,8 +29,8 @@ async def users_page(
                 "error": "Insufficient permissions"
             }
         )
-    with get_db() as db:
-        users = crud.get_users(db)
+    async with get_async_db() as db:
+        users = await async_crud.get_users(db)
         return templates.TemplateResponse(
             "users.html",
             {"request": request, "current_user": current_user, "users": users}
@@ -63,12 +61,17 @@ async def create_user(
             }
         )
     try:
-        with get_db() as db:
-            crud.create_user(db, schemas.UserCreate(username=username, password=password, role=role))
+        async with get_async_db() as db:
+            hashed_password = await auth.hash_new_password(db, username, password)
+            await async_crud.create_user(
+                db,
+                schemas.UserCreate(username=username, password=password, role=role),
+                hashed_password=hashed_password
+            )
             return RedirectResponse(url="/users", status_code=303)
     except HTTPException as e:
-        with get_db() as db:
-            users = crud.get_users(db)
+        async with get_async_db() as db:
+            users = await async_crud.get_users(db)
             return templates.TemplateResponse(
                 "users.html",
                 {
@@ -104,12 +107,12 @@ async def update_user(
             }
         )
     try:
-        with get_db() as db:
-            crud.update_user(db, user_id, schemas.UserUpdate(username=username, role=role))
+        async with get_async_db() as db:
+            await async_crud.update_user(db, user_id, schemas.UserUpdate(username=username, role=role))
             return RedirectResponse(url="/users", status_code=303)
     except HTTPException as e:
-        with get_db() as db:
-            users = crud.get_users(db)
+        async with get_async_db() as db:
+            users = await async_crud.get_users(db)
             return templates.TemplateResponse(
                 "users.html",
                 {
@@ -140,6 +143,6 @@ async def delete_user(
                 "error": "Insufficient permissions"
             }
         )
-    with get_db() as db:
-        crud.delete_user(db, user_id)
+    async with get_async_db() as db:
+        await async_crud.delete_user(db, user_id)
         return RedirectResponse(url="/users", status_code=303) 
\ No newline at end of file
@@ -0,0 +1,164 @@
+import re
+from typing import List, Optional, Tuple
+from .config import settings
+
+SEARCH_MODES = ("auto", "fts", "fuzzy", "substring")
+
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+_WORD_RE = re.compile(r"\w+")
+
+
+def parse_tsquery(search_query: str) -> List[Tuple[str, str]]:
+    """
+    Розбиває запит користувача на частини tsquery:
+    "фраза в лапках" - пошук фрази, слово* - пошук за префіксом, решта - звичайні слова
+    """
+    parts = []
+    for phrase in _PHRASE_RE.findall(search_query):
+        if _WORD_RE.search(phrase):
+            parts.append(("phraseto_tsquery", phrase))
+
+    plain_words = []
+    for token in _PHRASE_RE.sub(" ", search_query).split():
+        words = _WORD_RE.findall(token)
+        if not words:
+            continue
+        if token.endswith("*"):
+            plain_words.extend(words[:-1])
+            parts.append(("to_tsquery", "'%s':*" % words[-1]))
+        else:
+            plain_words.extend(words)
+
+    if plain_words:
+        parts.append(("plainto_tsquery", " ".join(plain_words)))
+    return parts
+
+
+def resolve_mode(search_query: str, mode: str) -> str:
+    if mode != "auto":
+        return mode
+    # Короткі запити не мають сенсу для словника - шукаємо слова за префіксом
+    if len(search_query.strip()) < settings.SEARCH_FTS_MIN_LENGTH:
+        return "prefix"
+    return "fts"
+
+
+def _fts_inner(parts: List[Tuple[str, str]]) -> Tuple[str, list]:
+    tsquery = " && ".join("%s(%%s::regconfig, %%s)" % func for func, _ in parts)
+    inner = """
+            SELECT t.*,
+                   c.name as category_name,
+                   ts_rank_cd(t.search_vector, q.query)::float8 as rank
+            FROM tasks t
+            CROSS JOIN (SELECT %s AS query) q
+            LEFT JOIN categories c ON t.category_id = c.id
+            WHERE t.search_vector @@ q.query
+    """ % tsquery
+    params = []
+    for _, text in parts:
+        params.extend([settings.SEARCH_LANGUAGE, text])
+    return inner, params
+
+
+def _fuzzy_inner(search_query: str) -> Tuple[str, list]:
+    inner = """
+            SELECT t.*,
+                   c.name as category_name,
+                   GREATEST(similarity(t.title, %s), similarity(COALESCE(t.description, ''), %s))::float8 as rank
+            FROM tasks t
+            LEFT JOIN categories c ON t.category_id = c.id
+            WHERE (t.title %% %s OR t.description %% %s)
+    """
+    return inner, [search_query] * 4
+
+
+def _substring_inner(search_query: str) -> Tuple[str, list]:
+    # Шаблони коротші за 3 символи trigram-індекс не обмежує - це послідовний перегляд
+    search_pattern = f"%{search_query}%"
+    inner = """
+            SELECT t.*,
+                   c.name as category_name,
+                   CASE
+                       WHEN t.title ILIKE %s THEN 1
+                       WHEN t.description ILIKE %s THEN 0.5
+                       ELSE 0
+                   END::float8 as rank
+            FROM tasks t
+            LEFT JOIN categories c ON t.category_id = c.id
+            WHERE t.title ILIKE %s
+               OR (t.description IS NOT NULL AND t.description ILIKE %s)
+    """
+    return inner, [search_pattern] * 4
+
+
+def _fts_or_fuzzy(parts: List[Tuple[str, str]], search_query: str) -> Tuple[str, list]:
+    """
+    Повнотекстовий пошук, а якщо він нічого не знайшов (опечатка, частина слова) -
+    trigram-схожість; обидві гілки використовують GIN-індекси, друга виконується
+    лише за порожньої першої
+    """
+    fts, fts_params = _fts_inner(parts)
+    fuzzy, fuzzy_params = _fuzzy_inner(search_query)
+    inner = """
+        WITH fts AS (%s),
+        fuzzy AS (%s AND NOT EXISTS (SELECT 1 FROM fts))
+        SELECT * FROM fts
+        UNION ALL
+        SELECT * FROM fuzzy
+    """ % (fts, fuzzy)
+    return inner, fts_params + fuzzy_params
+
+
+def build_search_query(
+    search_query: str,
+    mode: str = "auto",
+    limit: int = 100,
+    after: Optional[Tuple] = None
+) -> Tuple[str, list]:
+    """
+    Будує SQL пошуку задач, впорядкований за (rank, id) з keyset-пагінацією.
+    auto: повнотекстовий пошук (короткі запити - за префіксами слів) з переходом
+    до trigram-схожості, якщо збігів немає
+    """
+    if not search_query:
+        query = """
+        SELECT t.*,
+               c.name as category_name,
+               1 as rank
+        FROM tasks t
+        LEFT JOIN categories c ON t.category_id = c.id
+        """
+        params = []
+        if after:
+            query += " WHERE t.id < %s"
+            params.append(after[1])
+        query += " ORDER BY t.id DESC LIMIT %s"
+        params.append(limit)
+        return query, params
+
+    auto = mode == "auto"
+    mode = resolve_mode(search_query, mode)
+    if mode == "prefix":
+        parts = [("to_tsquery", "'%s':*" % word) for word in _WORD_RE.findall(search_query)]
+    else:
+        parts = parse_tsquery(search_query) if mode == "fts" else []
+    if mode in ("fts", "prefix") and not parts:
+        mode = "substring"
+
+    if auto and mode != "substring":
+        inner, params = _fts_or_fuzzy(parts, search_query)
+    elif mode in ("fts", "prefix"):
+        inner, params = _fts_inner(parts)
+    elif mode == "fuzzy":
+        inner, params = _fuzzy_inner(search_query)
+    else:
+        inner, params = _substring_inner(search_query)
+
+    # rank приводиться до float8, щоб значення з курсора точно збігалося з обчисленим
+    query = "SELECT * FROM (%s) ranked" % inner
+    if after:
+        query += " WHERE rank < %s OR (rank = %s AND id < %s)"
+        params.extend([after[0], after[0], after[1]])
+    query += " ORDER BY rank DESC, id DESC LIMIT %s"
+    params.append(limit)
+    return query, params
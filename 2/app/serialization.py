@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+from fastapi import HTTPException, status
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """
+    Розбирає параметр вибору полів ("id,title,status");
+    None означає всі поля моделі
+    """
+    if not fields:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown fields: %s" % ", ".join(sorted(unknown))
+        )
+    return selected or None
+
+
+def dump_one(model: Type[BaseModel], obj: Any, include: Optional[Set[str]] = None) -> Dict:
+    """Перетворює рядок БД або ORM-об'єкт на словник полів схеми"""
+    return model.model_validate(obj, from_attributes=True).model_dump(include=include)
+
+
+def dump_many(model: Type[BaseModel], objs: Iterable[Any], include: Optional[Set[str]] = None) -> List[Dict]:
+    """Те саме для списку: валідація та серіалізація всього списку за один виклик"""
+    adapter = _list_adapter(model)
+    items = adapter.validate_python(list(objs), from_attributes=True)
+    return adapter.dump_python(items, include={"__all__": include} if include else None)
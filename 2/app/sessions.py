@@ -0,0 +1,182 @@
+import hashlib
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from . import async_crud
+from .async_database import get_async_db
+from .auth import create_access_token, token_claims
+from .config import settings
+from .revocation import revocations
+
+ACCESS_COOKIE = "access_token"
+REFRESH_COOKIE = "refresh_token"
+
+# Шляхи без сесії користувача: продовжувати її там немає сенсу (вихід завершує сесію сам)
+SKIP_PATHS = (
+    "/static", "/metrics", "/api/db/pool", "/api/docs", "/api/redoc", "/api/openapi.json", "/favicon.ico", "/auth/logout"
+)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Токен - 256 випадкових біт, тож повільний хеш на кшталт bcrypt не потрібен
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _new_refresh_token() -> Tuple[str, str, datetime]:
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return token, hash_refresh_token(token), expires_at
+
+
+async def start_session(db, user: Dict) -> Tuple[str, str]:
+    """Access- та refresh-токен нової сесії після перевірки пароля"""
+    token, token_hash, expires_at = _new_refresh_token()
+    await async_crud.create_refresh_token(db, user['id'], token_hash, expires_at)
+    return create_access_token(token_claims(user)), token
+
+
+async def renew_session(db, refresh_token: str) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Новий access-токен за refresh-токеном без перевірки пароля; refresh-токен
+    ротується, а строк сесії відраховується заново. None - токен недійсний.
+    Якщо токен щойно ротував паралельний запит, видається лише access-токен
+    (новий refresh-токен клієнт отримає з відповіді на той запит)
+    """
+    old_hash = hash_refresh_token(refresh_token)
+    token, token_hash, expires_at = _new_refresh_token()
+    user = await async_crud.rotate_refresh_token(
+        db, old_hash, token_hash, expires_at, settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS
+    )
+    if user is None:
+        user = await async_crud.get_rotated_token_user(db, old_hash)
+        if user is None:
+            return None
+        token = None
+    return create_access_token(token_claims(user)), token
+
+
+async def end_session(db, refresh_token: str) -> None:
+    await async_crud.delete_refresh_token(db, hash_refresh_token(refresh_token))
+
+
+def set_session_cookies(response: Response, access_token: str, refresh_token: str) -> None:
+    response.set_cookie(key=ACCESS_COOKIE, value=f"Bearer {access_token}", httponly=True)
+    response.set_cookie(
+        key=REFRESH_COOKIE, value=refresh_token, httponly=True,
+        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    )
+
+
+def clear_session_cookies(response: Response) -> None:
+    response.delete_cookie(ACCESS_COOKIE)
+    response.delete_cookie(REFRESH_COOKIE)
+
+
+async def needs_renewal(access_token: Optional[str], renew_before: float) -> bool:
+    """
+    Access-токена немає, він недійсний, відкликаний (AUTH_STATELESS: змінилося
+    покоління користувача) або закінчується менш ніж за renew_before секунд
+    """
+    if not access_token:
+        return True
+    try:
+        payload = jwt.decode(
+            access_token.replace("Bearer ", ""), settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM], options={"verify_exp": False}
+        )
+    except JWTError:
+        return True
+    # Та сама перевірка, що й у get_current_user: відкликаний токен там дасть 401
+    if settings.AUTH_STATELESS and "gen" in payload:
+        if not await revocations.is_valid(payload["uid"], payload["gen"], payload.get("jti")):
+            return True
+    return payload.get("exp", 0) - time.time() < renew_before
+
+
+def _set_cookie_headers(build: Callable[[Response], None]) -> List[Tuple[bytes, bytes]]:
+    response = Response()
+    build(response)
+    return [(name, value) for name, value in response.raw_headers if name == b"set-cookie"]
+
+
+def _with_cookies(send: Send, set_cookies: List[Tuple[bytes, bytes]]) -> Send:
+    """Додає Set-Cookie до відповіді, якщо маршрут не встановив cookie сесії сам (вихід, повторний вхід)"""
+    async def send_wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            own = any(
+                name == b"set-cookie" and value.split(b"=", 1)[0] in (ACCESS_COOKIE.encode(), REFRESH_COOKIE.encode())
+                for name, value in message["headers"]
+            )
+            if not own:
+                message = {**message, "headers": [*message["headers"], *set_cookies]}
+        await send(message)
+
+    return send_wrapper
+
+
+def _replace_cookies(headers: List[Tuple[bytes, bytes]], values: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+    result = []
+    for name, value in headers:
+        if name == b"cookie":
+            parts = [
+                part.strip() for part in value.decode("latin-1").split(";")
+                if part.strip() and part.split("=", 1)[0].strip() not in values
+            ]
+            parts += ['%s="%s"' % item for item in values.items()]
+            value = "; ".join(parts).encode("latin-1")
+        result.append((name, value))
+    return result
+
+
+class SessionRenewalMiddleware:
+    """
+    ASGI-middleware тихого подовження сесії: якщо access-токен відсутній або
+    закінчується менш ніж за ACCESS_TOKEN_RENEW_MINUTES, а refresh-токен дійсний,
+    обидва перевидаються. Запит обробляється вже з новим access-токеном, а нові
+    cookie додаються до відповіді, тож bcrypt виконується лише при вході.
+    Недійсний refresh-токен видаляється з cookie, щоб не перевірятись щоразу
+    """
+
+    def __init__(self, app: ASGIApp, renew_before: Optional[float] = None, skip_paths: Tuple[str, ...] = SKIP_PATHS):
+        self.app = app
+        self.renew_before = settings.ACCESS_TOKEN_RENEW_MINUTES * 60 if renew_before is None else renew_before
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_paths):
+            await self.app(scope, receive, send)
+            return
+        cookies = cookie_parser(Headers(scope=scope).get("cookie", ""))
+        refresh_token = cookies.get(REFRESH_COOKIE)
+        if not refresh_token or not await needs_renewal(cookies.get(ACCESS_COOKIE), self.renew_before):
+            await self.app(scope, receive, send)
+            return
+
+        async with get_async_db() as db:
+            renewed = await renew_session(db, refresh_token)
+        if renewed is None:
+            expired = _set_cookie_headers(lambda response: response.delete_cookie(REFRESH_COOKIE))
+            await self.app(scope, receive, _with_cookies(send, expired))
+            return
+
+        access_token, new_refresh_token = renewed
+        values = {ACCESS_COOKIE: f"Bearer {access_token}"}
+        if new_refresh_token is None:
+            # Паралельний запит уже ротував токен: лише access-токен, refresh-cookie не змінюється
+            set_cookies = _set_cookie_headers(
+                lambda response: response.set_cookie(key=ACCESS_COOKIE, value=values[ACCESS_COOKIE], httponly=True)
+            )
+        else:
+            values[REFRESH_COOKIE] = new_refresh_token
+            set_cookies = _set_cookie_headers(
+                lambda response: set_session_cookies(response, access_token, new_refresh_token)
+            )
+        scope = dict(scope)
+        scope["headers"] = _replace_cookies(scope["headers"], values)
+        await self.app(scope, receive, _with_cookies(send, set_cookies))
@@ -0,0 +1,263 @@
+from typing import AsyncIterator, Dict, Optional
+import orjson
+import psycopg
+from fastapi import HTTPException, status
+from .schemas import TASK_STATUSES
+
+TRANSFER_FORMATS = ("csv", "ndjson")
+TASK_COLUMNS = ("id", "title", "description", "status", "priority", "due_date", "category_id", "category_name")
+
+# Розмір фрагментів, якими дані йдуть клієнту та в COPY
+CHUNK_SIZE = 64 * 1024
+
+_EXPORT_QUERY = """
+    SELECT t.id, t.title, t.description, t.status, t.priority, t.due_date,
+           t.category_id, c.name AS category_name
+    FROM tasks t
+    LEFT JOIN categories c ON t.category_id = c.id
+    WHERE t.user_id = %s
+    ORDER BY t.id
+"""
+
+# Усі поля текстові, щоб COPY не падав на некоректних значеннях -
+# перевірка робиться окремими запитами по всій таблиці
+_CREATE_STAGING = """
+    CREATE TEMP TABLE tasks_import (
+        row_no bigint GENERATED BY DEFAULT AS IDENTITY,
+        id text,
+        title text,
+        description text,
+        status text,
+        priority text,
+        due_date text,
+        category_id text,
+        category_name text,
+        task_id integer,
+        category_ref integer,
+        error text
+    ) ON COMMIT DROP
+"""
+
+_NORMALIZE = """
+    UPDATE tasks_import SET
+        id = NULLIF(btrim(id), ''),
+        title = btrim(title),
+        description = NULLIF(description, ''),
+        status = COALESCE(NULLIF(lower(btrim(status)), ''), 'pending'),
+        priority = CASE lower(COALESCE(btrim(priority), ''))
+            WHEN '' THEN '3'
+            WHEN 'low' THEN '1'
+            WHEN 'medium' THEN '3'
+            WHEN 'high' THEN '5'
+            ELSE btrim(priority)
+        END,
+        due_date = NULLIF(btrim(due_date), ''),
+        category_id = NULLIF(btrim(category_id), ''),
+        category_name = NULLIF(btrim(category_name), '')
+    WHERE error IS NULL
+"""
+
+# Дата перевіряється без приведення типу, щоб некоректне значення
+# давало помилку рядка, а не падіння всього запиту
+_VALIDATE = r"""
+    UPDATE tasks_import SET error = CASE
+        WHEN id IS NOT NULL AND id !~ '^\d{1,9}$' THEN 'Invalid id'
+        WHEN title IS NULL OR title = '' THEN 'Title is required'
+        WHEN length(title) > 200 THEN 'Title is longer than 200 characters'
+        WHEN status <> ALL(%s) THEN 'Invalid status'
+        WHEN priority !~ '^[1-5]$' THEN 'Invalid priority'
+        WHEN due_date IS NOT NULL AND NOT (
+            CASE WHEN due_date ~ '^[1-9]\d{3}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])([ T].*)?$'
+                 THEN substr(due_date, 9, 2)::int <= extract(day from
+                      date_trunc('month', (substr(due_date, 1, 7) || '-01')::date) + interval '1 month - 1 day')
+                 ELSE false
+            END
+        ) THEN 'Invalid due_date'
+        WHEN category_id IS NOT NULL AND category_id !~ '^\d{1,9}$' THEN 'Invalid category_id'
+        WHEN category_id IS NULL AND category_name IS NULL THEN 'Category is required'
+    END
+    WHERE error IS NULL
+"""
+
+_RESOLVE = """
+    UPDATE tasks_import i SET
+        category_ref = CASE
+            WHEN i.category_id IS NOT NULL
+                THEN (SELECT c.id FROM categories c WHERE c.id = i.category_id::int)
+            ELSE (SELECT c.id FROM categories c WHERE c.name = i.category_name)
+        END,
+        task_id = CASE
+            WHEN i.id IS NOT NULL
+                THEN (SELECT t.id FROM tasks t WHERE t.id = i.id::int AND t.user_id = %s)
+        END
+    WHERE i.error IS NULL
+"""
+
+_CHECK_REFERENCES = """
+    UPDATE tasks_import SET error = CASE
+        WHEN category_ref IS NULL THEN 'Category not found'
+        ELSE 'Task not found'
+    END
+    WHERE error IS NULL AND (category_ref IS NULL OR (id IS NOT NULL AND task_id IS NULL))
+"""
+
+_CHECK_DUPLICATES = """
+    UPDATE tasks_import i SET error = 'Duplicate id'
+    FROM (
+        SELECT row_no, row_number() OVER (PARTITION BY task_id ORDER BY row_no) AS n
+        FROM tasks_import
+        WHERE error IS NULL AND task_id IS NOT NULL
+    ) d
+    WHERE i.row_no = d.row_no AND d.n > 1
+"""
+
+_MERGE_UPDATE = """
+    UPDATE tasks t SET
+        title = i.title,
+        description = i.description,
+        status = i.status,
+        priority = i.priority,
+        due_date = left(i.due_date, 10)::date,
+        category_id = i.category_ref
+    FROM tasks_import i
+    WHERE i.error IS NULL AND i.task_id = t.id
+"""
+
+_MERGE_INSERT = """
+    INSERT INTO tasks (title, description, status, priority, due_date, user_id, category_id)
+    SELECT title, description, status, priority, left(due_date, 10)::date, %s, category_ref
+    FROM tasks_import
+    WHERE error IS NULL AND task_id IS NULL
+    ORDER BY row_no
+"""
+
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+async def export_tasks(db, user_id: int, fmt: str = "csv") -> AsyncIterator[bytes]:
+    """
+    Вивантажує завдання користувача через COPY TO STDOUT фрагментами по CHUNK_SIZE
+    """
+    if fmt == "ndjson":
+        # row_to_json не містить сирих переводів рядка та керуючих символів,
+        # тож csv з такими QUOTE/DELIMITER віддає JSON без змін
+        statement = (
+            "COPY (SELECT row_to_json(r) FROM (%s) r) TO STDOUT "
+            "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')" % _EXPORT_QUERY
+        )
+    else:
+        statement = "COPY (%s) TO STDOUT WITH (FORMAT csv, HEADER)" % _EXPORT_QUERY
+
+    buffer = bytearray()
+    async with db.cursor() as cursor:
+        async with cursor.copy(statement, (user_id,)) as copy:
+            async for data in copy:
+                buffer += data
+                if len(buffer) >= CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _ndjson_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value).decode()
+
+
+async def _copy_ndjson(cursor, chunks: AsyncIterator[bytes]) -> None:
+    columns = ", ".join(TASK_COLUMNS)
+    async with cursor.copy("COPY tasks_import (row_no, %s, error) FROM STDIN" % columns) as copy:
+        line_no = 0
+
+        async def write_line(line: bytes) -> None:
+            nonlocal line_no
+            line_no += 1
+            if not line.strip():
+                return
+            try:
+                item = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                item = None
+            if not isinstance(item, dict):
+                await copy.write_row((line_no,) + (None,) * len(TASK_COLUMNS) + ("Invalid JSON",))
+                return
+            await copy.write_row((line_no,) + tuple(_ndjson_value(item.get(c)) for c in TASK_COLUMNS) + (None,))
+
+        pending = b""
+        async for chunk in chunks:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                await write_line(line)
+        if pending:
+            await write_line(pending)
+
+
+async def _copy_csv(cursor, chunks: AsyncIterator[bytes]) -> None:
+    columns = ", ".join(TASK_COLUMNS)
+    async with cursor.copy("COPY tasks_import (%s) FROM STDIN WITH (FORMAT csv, HEADER MATCH)" % columns) as copy:
+        async for chunk in chunks:
+            await copy.write(chunk)
+
+
+async def import_tasks(
+    db,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str = "csv",
+    error_limit: int = 1000
+) -> Dict:
+    """
+    Завантажує файл у тимчасову таблицю через COPY FROM STDIN, перевіряє рядки
+    та зливає коректні з tasks однією транзакцією: рядки з id завдання
+    користувача оновлюють його, решта створюються. Некоректні рядки
+    потрапляють у звіт помилок (номер рядка даних або рядка NDJSON)
+    """
+    try:
+        async with db.cursor() as cursor:
+            await cursor.execute(_CREATE_STAGING)
+            if fmt == "ndjson":
+                await _copy_ndjson(cursor, chunks)
+            else:
+                await _copy_csv(cursor, chunks)
+
+            await cursor.execute(_NORMALIZE)
+            await cursor.execute(_VALIDATE, (list(TASK_STATUSES),))
+            await cursor.execute(_RESOLVE, (user_id,))
+            await cursor.execute(_CHECK_REFERENCES)
+            await cursor.execute(_CHECK_DUPLICATES)
+            await cursor.execute(_MERGE_UPDATE)
+            updated = cursor.rowcount
+            await cursor.execute(_MERGE_INSERT, (user_id,))
+            created = cursor.rowcount
+
+            await cursor.execute("SELECT count(*) AS n FROM tasks_import WHERE error IS NOT NULL")
+            failed = (await cursor.fetchone())['n']
+            await cursor.execute(
+                "SELECT row_no AS row, error FROM tasks_import WHERE error IS NOT NULL ORDER BY row_no LIMIT %s",
+                (error_limit,)
+            )
+            errors = await cursor.fetchall()
+        await db.commit()
+    except psycopg.DataError as e:
+        # Файл не розібрано (неправильний CSV, заголовок, кодування) - нічого не імпортовано
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file: %s" % str(e).strip()
+        )
+
+    return {
+        "created": created,
+        "updated": updated,
+        "failed": failed,
+        "errors": errors
+    }
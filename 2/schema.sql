@@ -5,6 +5,36 @@ CREATE TABLE IF NOT EXISTS users (
     role VARCHAR(20) NOT NULL
 );
 
+-- Покоління токенів: збільшення відкликає всі видані користувачу токени (AUTH_STATELESS)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_generation INTEGER NOT NULL DEFAULT 0;
+
+-- Список відкликання завантажує лише користувачів зі зміненим поколінням
+CREATE INDEX IF NOT EXISTS users_token_generation_idx ON users (id, token_generation) WHERE token_generation > 0;
+
+-- Видалені користувачі, чиї токени ще не закінчились (expires_at - видалення + строк access-токена)
+CREATE TABLE IF NOT EXISTS deleted_users (
+    user_id INTEGER PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Токени, відкликані при виході, зберігаються до закінчення терміну їхньої дії
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+-- Refresh-токени сесій (SHA-256 від випадкового значення з cookie), ротуються при кожному використанні
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    token_hash CHAR(64) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS refresh_tokens_user_id_idx ON refresh_tokens (user_id);
+
+-- Ротований токен лишається дійсним ще кілька секунд для паралельних запитів тієї ж сесії
+ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS rotated_at TIMESTAMPTZ;
+
 CREATE TABLE IF NOT EXISTS categories (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) UNIQUE NOT NULL
@@ -23,5 +53,97 @@ CREATE TABLE IF NOT EXISTS tasks (
 
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
+CREATE INDEX IF NOT EXISTS tasks_user_id_id_idx ON tasks (user_id, id);
+
 CREATE INDEX IF NOT EXISTS tasks_title_trgm_idx ON tasks USING gin (title gin_trgm_ops);
-CREATE INDEX IF NOT EXISTS tasks_description_trgm_idx ON tasks USING gin (description gin_trgm_ops); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS tasks_description_trgm_idx ON tasks USING gin (description gin_trgm_ops);
+
+-- Повнотекстовий пошук: вектор підтримується тригером, мова береться з параметра
+-- сесії app.search_language (застосунок передає SEARCH_LANGUAGE при підключенні).
+-- Після зміни мови вектори перебудовуються: UPDATE tasks SET title = title;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION tasks_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    config regconfig := COALESCE(NULLIF(current_setting('app.search_language', true), ''), 'english')::regconfig;
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(config, COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(config, COALESCE(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tasks_search_vector_trigger ON tasks;
+CREATE TRIGGER tasks_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_search_vector_update();
+
+UPDATE tasks SET title = title WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS tasks_search_vector_idx ON tasks USING gin (search_vector); 
+-- Версії даних для ETag сторінок і скидання кешів: спільні для всіх процесів,
+-- збільшуються тригерами в тій самій транзакції, що й зміна
+CREATE TABLE IF NOT EXISTS data_versions (
+    key VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_data_versions(keys TEXT[]) RETURNS void AS $$
+    INSERT INTO data_versions (key, version)
+    SELECT key, 1 FROM unnest(keys) AS key ORDER BY key
+    ON CONFLICT (key) DO UPDATE SET version = data_versions.version + 1;
+$$ LANGUAGE sql;
+
+-- Версія завдань кожного користувача ('tasks:<user_id>'): один раз на оператор,
+-- користувачі беруться з таблиць переходу
+CREATE OR REPLACE FUNCTION tasks_bump_versions() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_data_versions(ARRAY(SELECT DISTINCT 'tasks:' || user_id FROM new_rows WHERE user_id IS NOT NULL));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_data_versions(ARRAY(
+            SELECT 'tasks:' || user_id FROM old_rows WHERE user_id IS NOT NULL
+            UNION
+            SELECT 'tasks:' || user_id FROM new_rows WHERE user_id IS NOT NULL
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_data_versions(ARRAY(SELECT DISTINCT 'tasks:' || user_id FROM old_rows WHERE user_id IS NOT NULL));
+    ELSE
+        UPDATE data_versions SET version = version + 1 WHERE key LIKE 'tasks:%';
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tasks_versions_insert_trigger ON tasks;
+CREATE TRIGGER tasks_versions_insert_trigger
+    AFTER INSERT ON tasks REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_versions();
+
+DROP TRIGGER IF EXISTS tasks_versions_update_trigger ON tasks;
+CREATE TRIGGER tasks_versions_update_trigger
+    AFTER UPDATE ON tasks REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_versions();
+
+DROP TRIGGER IF EXISTS tasks_versions_delete_trigger ON tasks;
+CREATE TRIGGER tasks_versions_delete_trigger
+    AFTER DELETE ON tasks REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_versions();
+
+DROP TRIGGER IF EXISTS tasks_versions_truncate_trigger ON tasks;
+CREATE TRIGGER tasks_versions_truncate_trigger
+    AFTER TRUNCATE ON tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_versions();
+
+CREATE OR REPLACE FUNCTION categories_bump_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM bump_data_versions(ARRAY['categories']);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS categories_version_trigger ON categories;
+CREATE TRIGGER categories_version_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON categories
+    FOR EACH STATEMENT EXECUTE FUNCTION categories_bump_version();
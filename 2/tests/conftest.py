@@ -0,0 +1,18 @@
+import os
+
+# Налаштування за замовчуванням, щоб модулі застосунку імпортувались без .env;
+# тести використовують підмінені з'єднання, тож до БД не звертаються
+for name, value in {
+    "DB_NAME": "tasks",
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "postgres",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DEBUG": "false",
+    "HOST": "127.0.0.1",
+    "PORT": "8000",
+}.items():
+    os.environ.setdefault(name, value)
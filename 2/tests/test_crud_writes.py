@@ -0,0 +1,190 @@
+"""
+Кожна зміна користувача, категорії чи завдання в crud та async_crud -
+рівно один SQL-запит: і при успіху, і при конфлікті (400), і коли запису немає (404).
+Пакет з лише помилковими операціями повертає статус кожної з них
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from psycopg import errors as async_errors
+from psycopg2 import errors
+from app import async_crud, crud, schemas
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        self.connection.statements.append(query)
+        if self.connection.error is not None:
+            raise self.connection.error
+
+    def fetchone(self):
+        return self.connection.row
+
+    def fetchall(self):
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RecordingConnection:
+    """Підміна з'єднання psycopg2: записує запити, повертає заданий рядок або помилку"""
+
+    def __init__(self, row=None, error=None):
+        self.row = row
+        self.error = error
+        self.statements = []
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class AsyncRecordingCursor(RecordingCursor):
+    async def execute(self, query, params=None):
+        RecordingCursor.execute(self, query, params)
+
+    async def fetchone(self):
+        return self.connection.row
+
+    async def fetchall(self):
+        return []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class AsyncRecordingConnection(RecordingConnection):
+    """Підміна асинхронного з'єднання psycopg"""
+
+    def cursor(self, *args, **kwargs):
+        return AsyncRecordingCursor(self)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def _row():
+    return {"id": 1, "username": "user", "old_username": "old", "token_generation": 0, "name": "Work"}
+
+
+USER = schemas.UserCreate(username="user", password="secret")
+USER_UPDATE = schemas.UserUpdate(username="user")
+CATEGORY = schemas.CategoryCreate(name="Work")
+CATEGORY_UPDATE = schemas.CategoryUpdate(name="Work")
+TASK = schemas.TaskCreate(title="Task", category_id=1)
+TASK_UPDATE = schemas.TaskUpdate(title="Task")
+
+# (функція, аргументи після db, помилка запиту, рядок-результат, очікуваний статус)
+CASES = [
+    ("create_user", (USER,), None, _row, None),
+    ("create_user", (USER,), None, None, 400),
+    ("update_user", (1, USER_UPDATE), None, _row, None),
+    ("update_user", (1, USER_UPDATE), "UniqueViolation", None, 400),
+    ("update_user", (1, USER_UPDATE), None, None, 404),
+    ("delete_user", (1,), None, _row, None),
+    ("delete_user", (1,), None, None, 404),
+    ("create_category", (CATEGORY,), None, _row, None),
+    ("create_category", (CATEGORY,), None, None, 400),
+    ("update_category", (1, CATEGORY_UPDATE), None, _row, None),
+    ("update_category", (1, CATEGORY_UPDATE), "UniqueViolation", None, 400),
+    ("update_category", (1, CATEGORY_UPDATE), None, None, 404),
+    ("delete_category", (1,), None, _row, None),
+    ("delete_category", (1,), None, None, 404),
+    ("create_task", (TASK, 1), None, _row, None),
+    ("create_task", (TASK, 1), "ForeignKeyViolation", None, 404),
+    ("update_task", (1, TASK_UPDATE, 1), None, _row, None),
+    ("update_task", (1, TASK_UPDATE, 1), "ForeignKeyViolation", None, 404),
+    ("update_task", (1, TASK_UPDATE, 1), None, None, 404),
+    ("delete_task", (1, 1), None, _row, None),
+    ("delete_task", (1, 1), None, None, 404),
+]
+
+
+def _case_id(case):
+    name, _, error, row, expected = case
+    return "%s-%s" % (name, expected or "ok")
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hash(monkeypatch):
+    async def fake_hash_async(password):
+        return "hash"
+
+    monkeypatch.setattr(crud, "get_password_hash", lambda password: "hash")
+    monkeypatch.setattr(async_crud, "get_password_hash_async", fake_hash_async)
+
+
+def _check(call, db, expected):
+    if expected is None:
+        call()
+    else:
+        with pytest.raises(HTTPException) as exc_info:
+            call()
+        assert exc_info.value.status_code == expected
+    assert len(db.statements) == 1, db.statements
+
+
+@pytest.mark.parametrize("case", CASES, ids=_case_id)
+def test_sync_write_is_single_statement(case):
+    name, args, error, row, expected = case
+    db = RecordingConnection(
+        row=row() if row else None,
+        error=getattr(errors, error)() if error else None
+    )
+    _check(lambda: getattr(crud, name)(db, *args), db, expected)
+
+
+@pytest.mark.parametrize("case", CASES, ids=_case_id)
+def test_async_write_is_single_statement(case):
+    name, args, error, row, expected = case
+    db = AsyncRecordingConnection(
+        row=row() if row else None,
+        error=getattr(async_errors, error)() if error else None
+    )
+    _check(lambda: asyncio.run(getattr(async_crud, name)(db, *args)), db, expected)
+
+
+# Пакет, жодна операція якого не проходить перевірку: не своє завдання (404),
+# повтор id (409), створення без назви й категорії (422)
+INVALID_BATCH = [
+    schemas.TaskBatchOperation(op="update", id=5, task=schemas.TaskUpdate(title="Task")),
+    schemas.TaskBatchOperation(op="delete", id=5),
+    schemas.TaskBatchOperation(op="create", task=schemas.TaskUpdate(description="Task")),
+]
+
+
+@pytest.fixture
+def empty_category_cache(monkeypatch):
+    monkeypatch.setattr(crud.category_cache, "get", lambda: None)
+
+
+def _check_invalid_batch(results):
+    assert [result["status"] for result in results] == [404, 409, 422]
+
+
+def test_sync_batch_with_only_invalid_operations_returns_results(empty_category_cache):
+    db = RecordingConnection()
+    _check_invalid_batch(crud.batch_tasks(db, 1, INVALID_BATCH))
+
+
+def test_async_batch_with_only_invalid_operations_returns_results(empty_category_cache):
+    db = AsyncRecordingConnection()
+    _check_invalid_batch(asyncio.run(async_crud.batch_tasks(db, 1, INVALID_BATCH)))
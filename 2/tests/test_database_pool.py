@@ -0,0 +1,76 @@
+"""
+Пул з'єднань закриває з'єднання, що простояли довше за max_idle, і
+зменшується до minconn, навіть якщо з'єднання видаються і повертаються постійно
+"""
+import pytest
+from psycopg2 import extensions
+from app import database
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """Підміна з'єднання psycopg2 без сервера"""
+
+    info = FakeInfo()
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(database.psycopg2, "connect", lambda **kwargs: FakeConnection())
+    monkeypatch.setattr(database.time, "monotonic", clock)
+    return clock
+
+
+def _pool(minconn: int = 1, maxconn: int = 5) -> database.ConnectionPool:
+    return database.ConnectionPool(minconn, maxconn, timeout=1, max_idle=60, health_check=False)
+
+
+def test_busy_pool_expires_old_idle_connections(clock):
+    pool = _pool()
+    connections = [pool.getconn() for _ in range(4)]
+    for conn in connections:
+        pool.putconn(conn)
+    assert pool.stats()["idle"] == 4
+
+    # Одне з'єднання використовується постійно, решта простоює
+    clock.now += 30
+    for _ in range(3):
+        pool.putconn(pool.getconn())
+        clock.now += 20
+
+    stats = pool.stats()
+    assert stats["idle"] == 1
+    assert stats["created"] == 4
+    assert stats["discarded"] == 3
+    assert sum(conn.closed for conn in connections) == 3
+
+
+def test_idle_pool_keeps_minconn(clock):
+    pool = _pool(minconn=2)
+    connections = [pool.getconn() for _ in range(3)]
+    for conn in connections:
+        pool.putconn(conn)
+
+    clock.now += 120
+    conn = pool.getconn()
+    assert not conn.closed
+    stats = pool.stats()
+    assert (stats["in_use"], stats["idle"], stats["discarded"]) == (1, 1, 1)
@@ -0,0 +1,38 @@
+"""
+/metrics доступний лише адресам і мережам з METRICS_ALLOWED_HOSTS,
+решті клієнтів ендпоінт відповідає 404, ніби його немає
+"""
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.metrics import host_allowed
+
+
+@pytest.mark.parametrize("host, allowed, expected", [
+    ("127.0.0.1", "127.0.0.1,::1", True),
+    ("::1", "127.0.0.1,::1", True),
+    ("10.1.2.3", "127.0.0.1, 10.0.0.0/8", True),
+    ("192.168.0.1", "127.0.0.1,10.0.0.0/8", False),
+    ("192.168.0.1", "*", True),
+    ("testclient", "127.0.0.1", False),
+    (None, "127.0.0.1", False),
+    ("127.0.0.1", "", False),
+])
+def test_host_allowed(host, allowed, expected):
+    assert host_allowed(host, allowed) is expected
+
+
+@pytest.mark.parametrize("client_host, allowed, status_code", [
+    ("127.0.0.1", "127.0.0.1,::1", 200),
+    ("10.1.2.3", "10.0.0.0/8", 200),
+    ("203.0.113.5", "127.0.0.1,::1", 404),
+    ("203.0.113.5", "*", 200),
+])
+def test_metrics_endpoint_restricted(monkeypatch, client_host, allowed, status_code):
+    monkeypatch.setattr(settings, "METRICS_ALLOWED_HOSTS", allowed)
+    # Без lifespan: /metrics не звертається до БД
+    response = TestClient(app, client=(client_host, 50000)).get("/metrics")
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert response.headers["content-type"].startswith("text/plain")
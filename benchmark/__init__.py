@@ -0,0 +1,6 @@
+"""
+Навантажувальне тестування застосунків 1/ та 2/
+
+    python -m benchmark run --app 2 --concurrency 32 --duration 60 --output results.json
+    python -m benchmark compare before.json after.json
+"""
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+from .compression import compression_benchmark
+from .concurrency import FAST_ENDPOINT, MODES, concurrency_benchmark
+from .dataset import DatasetConfig
+from .runner import APPS, benchmark, serve
+from .scenarios import SCENARIOS, parse_mix
+
+# Показники, що порівнюються між запусками
+COMPARED = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _run(args: argparse.Namespace) -> int:
+    config = DatasetConfig(
+        users=args.users, tasks_per_user=args.tasks_per_user, categories=args.categories, seed=args.seed
+    )
+    mix = parse_mix(args.mix)
+    server = nullcontext(args.url) if args.url else serve(args.app, workers=args.workers)
+    with server as base_url:
+        result = asyncio.run(benchmark(
+            args.app if not args.url else None, base_url, config, mix,
+            args.concurrency, args.duration, args.warmup
+        ))
+
+    _write(result, args.output)
+
+    total = result["total"]
+    print(
+        "%d requests, %.1f req/s, p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, %d errors"
+        % (total["requests"], total["throughput_rps"], total["p50_ms"], total["p95_ms"], total["p99_ms"],
+           total["errors"]),
+        file=sys.stderr
+    )
+    return 0
+
+
+def _write(result: Dict, output: Optional[str]) -> None:
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def _compression(args: argparse.Namespace) -> int:
+    server = nullcontext(args.url) if args.url else serve(args.app, workers=1)
+    with server as base_url:
+        result = asyncio.run(compression_benchmark(
+            args.app if not args.url else None, base_url, args.tasks, args.repeat, args.seed
+        ))
+    _write(result, args.output)
+    for encoding, stats in result["transfer"].items():
+        print("%-8s %9d bytes on wire, p50 %.1f ms" % (encoding, stats["bytes_on_wire"], stats["p50_ms"]), file=sys.stderr)
+    return 0
+
+
+def _concurrency(args: argparse.Namespace) -> int:
+    # Із --url режим задає сам запущений сервер, тож вимірюється лише він
+    modes = {"url": None} if args.url else {mode: MODES[mode] for mode in args.modes.split(",")}
+    result = {}
+    for mode, env in modes.items():
+        server = nullcontext(args.url) if args.url else serve("1", workers=1, env=env)
+        with server as base_url:
+            result[mode] = asyncio.run(concurrency_benchmark(
+                "1" if not args.url else None, base_url, args.tasks, args.slow_clients, args.fast_clients,
+                args.duration, args.warmup, args.seed
+            ))
+    _write(result, args.output)
+    for mode, report in result.items():
+        for endpoint, stats in report["endpoints"].items():
+            print(
+                "%-6s %-34s %7.1f req/s, p50 %.1f ms, p95 %.1f ms"
+                % (mode, endpoint, stats["throughput_rps"], stats["p50_ms"], stats["p95_ms"]),
+                file=sys.stderr
+            )
+    return 0
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    return round((after - before) / before * 100, 1) if before else None
+
+
+def compare(before: Dict, after: Dict) -> Dict:
+    """Зміна показників у відсотках для кожної кінцевої точки, спільної для обох запусків"""
+    endpoints = {
+        name: {key: _change(before["endpoints"][name][key], stats[key]) for key in COMPARED}
+        for name, stats in after["endpoints"].items()
+        if name in before["endpoints"]
+    }
+    return {
+        "before": before["meta"].get("commit"),
+        "after": after["meta"].get("commit"),
+        "total": {key: _change(before["total"][key], after["total"][key]) for key in COMPARED},
+        "endpoints": endpoints,
+    }
+
+
+def _compare(args: argparse.Namespace) -> int:
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    print(json.dumps(compare(before, after), indent=2, ensure_ascii=False))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Навантажувальне тестування 1/ та 2/")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="заповнити дані, виконати навантаження та вивести JSON-звіт")
+    target = run.add_mutually_exclusive_group(required=True)
+    target.add_argument("--app", choices=APPS, help="запустити app.main:app застосунку 1/ або 2/ через uvicorn")
+    target.add_argument("--url", help="адреса вже запущеного застосунку")
+    run.add_argument("--workers", type=int, default=1, help="кількість процесів uvicorn (з --app)")
+    run.add_argument("--users", type=int, default=10)
+    run.add_argument("--tasks-per-user", type=int, default=200)
+    run.add_argument("--categories", type=int, default=10)
+    run.add_argument("--seed", type=int, default=42, help="зерно генератора даних і вибору сценаріїв")
+    run.add_argument("--concurrency", type=int, default=16, help="кількість одночасних клієнтів")
+    run.add_argument("--duration", type=float, default=30, help="тривалість вимірювання, с")
+    run.add_argument("--warmup", type=float, default=5, help="прогрів перед вимірюванням, с")
+    run.add_argument("--mix", help="ваги сценаріїв, наприклад api_search=0,tasks_page=40 (%s)" % ", ".join(SCENARIOS))
+    run.add_argument("--output", help="файл для JSON-звіту (за замовчуванням stdout)")
+    run.set_defaults(handler=_run)
+
+    size = commands.add_parser("compression", help="розмір і CPU-вартість стиснення сторінки з великою кількістю завдань")
+    target = size.add_mutually_exclusive_group(required=True)
+    target.add_argument("--app", choices=APPS)
+    target.add_argument("--url")
+    size.add_argument("--tasks", type=int, default=5000)
+    size.add_argument("--repeat", type=int, default=10)
+    size.add_argument("--seed", type=int, default=42)
+    size.add_argument("--output")
+    size.set_defaults(handler=_compression)
+
+    mixed = commands.add_parser(
+        "concurrency", help="затримка швидких запитів 1/ поруч із повільними: синхронна та асинхронна сесія"
+    )
+    target = mixed.add_mutually_exclusive_group()
+    target.add_argument("--url", help="адреса вже запущеного застосунку 1/ (замість запуску в кожному режимі)")
+    mixed.add_argument("--modes", default=",".join(MODES), help="режими DB_ASYNC через кому (%s)" % ", ".join(MODES))
+    mixed.add_argument("--tasks", type=int, default=2000, help="кількість завдань на повільній сторінці")
+    mixed.add_argument("--slow-clients", type=int, default=4)
+    mixed.add_argument("--fast-clients", type=int, default=16, help="клієнти, що запитують %s" % FAST_ENDPOINT)
+    mixed.add_argument("--duration", type=float, default=30)
+    mixed.add_argument("--warmup", type=float, default=5)
+    mixed.add_argument("--seed", type=int, default=42)
+    mixed.add_argument("--output")
+    mixed.set_defaults(handler=_concurrency)
+
+    diff = commands.add_parser("compare", help="порівняти два JSON-звіти (зміна у відсотках)")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    diff.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import gzip
+import time
+from typing import Dict, List
+import brotli
+import httpx
+from .dataset import DatasetConfig, login, seed
+from .runner import run_metadata
+from .stats import percentile
+
+# Сторінка з усіма завданнями користувача (потоковий рендеринг)
+PAGE_PATH = "/tasks?stream=true"
+ENCODINGS = ("identity", "gzip", "br")
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6)
+
+
+async def _measure_transfer(base_url: str, username: str, repeat: int) -> Dict:
+    """Байти на дроті та затримка сторінки для кожного Accept-Encoding"""
+    result = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await login(client, username)
+        for encoding in ENCODINGS:
+            latencies, wire, body = [], 0, 0
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await client.get(PAGE_PATH, headers={"Accept-Encoding": encoding})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                wire, body = response.num_bytes_downloaded, len(response.content)
+            latencies.sort()
+            result[encoding] = {
+                "content_encoding": response.headers.get("content-encoding", "identity"),
+                "bytes_on_wire": wire,
+                "body_bytes": body,
+                "ratio": round(body / wire, 2) if wire else None,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            }
+    return result
+
+
+def _cpu_cost(name: str, data: bytes, compress, repeat: int) -> Dict:
+    started = time.process_time()
+    for _ in range(repeat):
+        compressed = compress(data)
+    cpu = (time.process_time() - started) / repeat
+    return {
+        "codec": name,
+        "bytes": len(compressed),
+        "ratio": round(len(data) / len(compressed), 2),
+        "cpu_ms": round(cpu * 1000, 3),
+        "mb_per_cpu_second": round(len(data) / cpu / 1e6, 1) if cpu else None,
+    }
+
+
+def measure_cpu(data: bytes, repeat: int) -> List[Dict]:
+    """CPU-час стиснення тієї самої сторінки різними рівнями gzip та brotli"""
+    results = [
+        _cpu_cost("gzip-%d" % level, data, lambda d, level=level: gzip.compress(d, compresslevel=level), repeat)
+        for level in GZIP_LEVELS
+    ]
+    results += [
+        _cpu_cost("br-%d" % quality, data, lambda d, quality=quality: brotli.compress(d, quality=quality), repeat)
+        for quality in BROTLI_QUALITIES
+    ]
+    return results
+
+
+async def compression_benchmark(app, base_url: str, tasks: int, repeat: int, seed_value: int) -> Dict:
+    """
+    Заповнює одного користувача tasks завданнями та вимірює сторінку з усіма ними:
+    розмір відповіді для identity/gzip/br і CPU-вартість рівнів стиснення
+    """
+    config = DatasetConfig(users=1, tasks_per_user=tasks, categories=10, seed=seed_value)
+    await seed(base_url, config)
+    username = config.username(0)
+    transfer = await _measure_transfer(base_url, username, repeat)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await login(client, username)
+        page = (await client.get(PAGE_PATH, headers={"Accept-Encoding": "identity"})).content
+
+    return {
+        "meta": {**run_metadata(app, base_url), "tasks": tasks, "repeat": repeat, "page": PAGE_PATH},
+        "transfer": transfer,
+        "cpu": measure_cpu(page, repeat),
+    }
@@ -0,0 +1,90 @@
+import asyncio
+import random
+import time
+from typing import Dict, List
+import httpx
+from .dataset import DatasetConfig, login, seed
+from .runner import run_metadata
+from .stats import Stats
+
+# Повільний запит: сторінка з усіма завданнями користувача (тисячі рядків з БД)
+SLOW_PATH = "/tasks?stream=true"
+# Швидкий запит: одне завдання за первинним ключем
+FAST_ENDPOINT = "GET /api/v1/tasks/{task_id}"
+# Режими сесії SQLAlchemy застосунку 1/
+MODES = {"sync": {"DB_ASYNC": "false"}, "async": {"DB_ASYNC": "true"}}
+
+
+async def run_mixed(
+    base_url: str,
+    username: str,
+    task_ids: List[int],
+    slow_clients: int,
+    fast_clients: int,
+    duration: float,
+    warmup: float,
+    seed_value: int
+) -> Dict:
+    """
+    Замкнений цикл: slow_clients клієнтів без пауз запитують SLOW_PATH, а fast_clients -
+    окремі завдання. Затримка швидких запитів показує, наскільки повільні їх блокують
+    """
+    stats = Stats()
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) for _ in range(slow_clients + fast_clients)]
+    try:
+        for client in clients:
+            await login(client, username)
+        started = time.perf_counter()
+        stats.measure_from = started + warmup
+        deadline = stats.measure_from + duration
+
+        async def slow(client: httpx.AsyncClient) -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(SLOW_PATH)
+                stats.record("GET " + SLOW_PATH, started, time.perf_counter() - started, response.status_code == 200)
+
+        async def fast(client: httpx.AsyncClient, rng: random.Random) -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/api/v1/tasks/%d" % rng.choice(task_ids))
+                stats.record(FAST_ENDPOINT, started, time.perf_counter() - started, response.status_code == 200)
+
+        await asyncio.gather(
+            *(slow(client) for client in clients[:slow_clients]),
+            *(fast(client, random.Random("%s:fast:%s" % (seed_value, index)))
+              for index, client in enumerate(clients[slow_clients:]))
+        )
+        measured = time.perf_counter() - stats.measure_from
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    result = stats.report(measured)
+    result["measured_seconds"] = round(measured, 3)
+    return result
+
+
+async def concurrency_benchmark(
+    app, base_url: str, tasks: int, slow_clients: int, fast_clients: int,
+    duration: float, warmup: float, seed_value: int
+) -> Dict:
+    """Заповнює одного користувача tasks завданнями та виконує змішане навантаження"""
+    config = DatasetConfig(users=1, tasks_per_user=tasks, categories=10, seed=seed_value)
+    dataset = await seed(base_url, config)
+    username = config.username(0)
+    result = await run_mixed(
+        base_url, username, dataset.task_ids[username], slow_clients, fast_clients, duration, warmup, seed_value
+    )
+    return {
+        "meta": {
+            **run_metadata(app, base_url),
+            "tasks": tasks,
+            "slow_clients": slow_clients,
+            "fast_clients": fast_clients,
+            "duration": duration,
+            "warmup": warmup,
+        },
+        **result,
+    }
@@ -0,0 +1,146 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import httpx
+
+# Слова для назв та описів: пошук має знаходити як поодинокі, так і часті збіги
+WORDS = (
+    "report", "meeting", "deploy", "review", "invoice", "backup", "design", "refactor",
+    "release", "budget", "interview", "migration", "audit", "training", "support", "roadmap",
+    "analysis", "testing", "documentation", "planning", "security", "database", "frontend", "api",
+)
+# Ті самі статуси, що й TASK_STATUSES застосунку
+STATUSES = ("pending", "in_progress", "completed")
+
+# Розмір пакета для /api/v1/tasks/batch (не більше TASKS_BATCH_MAX)
+BATCH_SIZE = 500
+PAGE_SIZE = 500
+
+ADMIN_USERNAME = "bench_admin"
+PASSWORD = "bench-password"
+
+
+@dataclass
+class DatasetConfig:
+    users: int = 10
+    tasks_per_user: int = 200
+    categories: int = 10
+    seed: int = 42
+
+    def username(self, index: int) -> str:
+        return "bench_user_%04d" % index
+
+    def category_name(self, index: int) -> str:
+        return "bench_category_%02d" % index
+
+
+@dataclass
+class Dataset:
+    config: DatasetConfig
+    category_ids: List[int] = field(default_factory=list)
+    # ID завдань кожного користувача, створених при заповненні
+    task_ids: Dict[str, List[int]] = field(default_factory=dict)
+
+
+def make_task(rng: random.Random, category_ids: List[int]) -> Dict:
+    title = " ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize()
+    return {
+        "title": title,
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 20))),
+        "category_id": rng.choice(category_ids),
+        "status": rng.choice(STATUSES),
+        "priority": rng.choice((1, 3, 5)),
+        "due_date": "2025-%02d-%02dT00:00:00" % (rng.randint(1, 12), rng.randint(1, 28)),
+    }
+
+
+async def register(client: httpx.AsyncClient, username: str, role: str = "user") -> None:
+    # Якщо користувач уже існує, сторінка реєстрації повертається з помилкою - це не заважає
+    await client.post("/auth/register", data={"username": username, "password": PASSWORD, "role": role})
+
+
+async def login(client: httpx.AsyncClient, username: str) -> None:
+    response = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+    if response.status_code != 303 or "access_token" not in client.cookies:
+        raise RuntimeError("Login failed for %s (status %s)" % (username, response.status_code))
+
+
+async def _check(response: httpx.Response) -> Dict:
+    if response.status_code >= 400:
+        raise RuntimeError("%s %s -> %s: %s" % (
+            response.request.method, response.request.url.path, response.status_code, response.text[:200]
+        ))
+    return response.json() if response.content else {}
+
+
+async def _ensure_categories(admin: httpx.AsyncClient, config: DatasetConfig) -> List[int]:
+    existing = {c["name"]: c["id"] for c in await _check(await admin.get("/api/v1/categories"))}
+    ids = []
+    for index in range(config.categories):
+        name = config.category_name(index)
+        if name not in existing:
+            created = await _check(await admin.post("/api/v1/categories", json={"name": name}))
+            existing[name] = created["id"]
+        ids.append(existing[name])
+    return ids
+
+
+async def _reset_tasks(client: httpx.AsyncClient) -> None:
+    ids, cursor = [], None
+    while True:
+        params = {"fields": "id", "limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        page = await _check(await client.get("/api/v1/tasks", params=params))
+        ids.extend(t["id"] for t in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    for start in range(0, len(ids), BATCH_SIZE):
+        operations = [{"op": "delete", "id": task_id} for task_id in ids[start:start + BATCH_SIZE]]
+        await _check(await client.post("/api/v1/tasks/batch", json={"operations": operations}))
+
+
+async def _seed_user(client: httpx.AsyncClient, dataset: Dataset, index: int) -> None:
+    config = dataset.config
+    username = config.username(index)
+    await register(client, username)
+    await login(client, username)
+    await _reset_tasks(client)
+
+    # Окремий генератор на користувача: дані не залежать від порядку виконання
+    rng = random.Random("%s:%s" % (config.seed, index))
+    task_ids = []
+    for start in range(0, config.tasks_per_user, BATCH_SIZE):
+        count = min(BATCH_SIZE, config.tasks_per_user - start)
+        operations = [{"op": "create", "task": make_task(rng, dataset.category_ids)} for _ in range(count)]
+        results = (await _check(await client.post("/api/v1/tasks/batch", json={"operations": operations})))["results"]
+        failed = [r for r in results if r["status"] >= 400]
+        if failed:
+            raise RuntimeError("Seeding tasks for %s failed: %s" % (username, failed[0]))
+        task_ids.extend(r["id"] for r in results)
+    dataset.task_ids[username] = task_ids
+
+
+async def seed(base_url: str, config: DatasetConfig, concurrency: int = 8, timeout: Optional[float] = 60) -> Dataset:
+    """
+    Заповнює застосунок тестовими даними через HTTP (однаково для 1/ та 2/):
+    адміністратор, категорії, користувачі та їхні завдання. Завдання користувачів
+    видаляються та створюються наново, тож кожен запуск стартує з того самого набору
+    """
+    dataset = Dataset(config)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as admin:
+        await register(admin, ADMIN_USERNAME, role="admin")
+        await login(admin, ADMIN_USERNAME)
+        dataset.category_ids = await _ensure_categories(admin, config)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def seed_one(index: int) -> None:
+        async with semaphore:
+            async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+                await _seed_user(client, dataset, index)
+
+    await asyncio.gather(*(seed_one(i) for i in range(config.users)))
+    return dataset
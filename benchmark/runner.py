@@ -0,0 +1,193 @@
+import asyncio
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import httpx
+from .dataset import ADMIN_USERNAME, Dataset, DatasetConfig, login, seed
+from .scenarios import SCENARIOS, VirtualUser
+from .stats import Stats
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APPS = ("1", "2")
+
+# Усі віртуальні користувачі входять з 127.0.0.1, тож обмеження частоти входу
+# за IP та іменем вимикається; обмеження одночасних спроб входу лишається
+SERVER_ENV = {"LOGIN_RATE_LIMIT": "false"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(app: Optional[str], base_url: str) -> Dict:
+    """Коміт, час та середовище запуску - для порівняння звітів між комітами"""
+    return {
+        "app": app,
+        "url": base_url,
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+@contextmanager
+def serve(app: str, workers: int = 1, startup_timeout: float = 30, env: Optional[Dict[str, str]] = None) -> Iterator[str]:
+    """
+    Запускає app.main:app застосунку 1/ або 2/ через uvicorn на вільному порту;
+    env доповнює змінні оточення процесу (наприклад, DB_ASYNC)
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+        ],
+        cwd=REPO_ROOT / app,
+        env={**os.environ, **SERVER_ENV, **(env or {}), "PYTHONPATH": str(REPO_ROOT / app)},
+    )
+    base_url = "http://127.0.0.1:%d" % port
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("Server exited with code %s" % process.returncode)
+            try:
+                if httpx.get(base_url + "/auth/login", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("Server did not start within %s seconds" % startup_timeout)
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _available_paths(base_url: str) -> set:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get("/api/openapi.json")
+        response.raise_for_status()
+        return set(response.json()["paths"])
+
+
+async def run_load(
+    base_url: str,
+    dataset: Dataset,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed_value: int
+) -> Dict:
+    """
+    Замкнений цикл навантаження: concurrency клієнтів без пауз виконують сценарії,
+    обрані за вагами, протягом warmup + duration секунд
+    """
+    paths = await _available_paths(base_url)
+    mix = {name: weight for name, weight in mix.items() if weight > 0 and SCENARIOS[name].path in paths}
+    if not mix:
+        raise ValueError("No scenarios left to run")
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    usernames = sorted(dataset.task_ids)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as admin:
+        await login(admin, ADMIN_USERNAME)
+        clients = [httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) for _ in range(concurrency)]
+        try:
+            users = []
+            for index, client in enumerate(clients):
+                username = usernames[index % len(usernames)]
+                await login(client, username)
+                users.append(VirtualUser(
+                    client=client, admin=admin, username=username, dataset=dataset,
+                    rng=random.Random("%s:vu:%s" % (seed_value, index)), stats=stats
+                ))
+
+            started = time.perf_counter()
+            stats.measure_from = started + warmup
+            deadline = stats.measure_from + duration
+
+            async def worker(vu: VirtualUser) -> None:
+                while time.perf_counter() < deadline:
+                    name = vu.rng.choices(names, weights)[0]
+                    try:
+                        await SCENARIOS[name].run(vu)
+                    except httpx.HTTPError as e:
+                        # Помилки з'єднання та таймаути не мають коректної затримки
+                        vu.stats.transport_error(name)
+                        print("%s: %r" % (name, e), file=sys.stderr)
+
+            await asyncio.gather(*(worker(vu) for vu in users))
+            measured = time.perf_counter() - stats.measure_from
+        finally:
+            for client in clients:
+                await client.aclose()
+
+    result = stats.report(measured)
+    result["mix"] = mix
+    result["measured_seconds"] = round(measured, 3)
+    return result
+
+
+async def benchmark(
+    app: Optional[str],
+    base_url: Optional[str],
+    config: DatasetConfig,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float
+) -> Dict:
+    """Заповнення даними, навантаження та звіт з метаданими запуску"""
+    seeded = time.perf_counter()
+    dataset = await seed(base_url, config)
+    seed_seconds = time.perf_counter() - seeded
+
+    result = await run_load(base_url, dataset, mix, concurrency, duration, warmup, config.seed)
+    return {
+        "meta": {
+            **run_metadata(app, base_url),
+            "dataset": {
+                "users": config.users,
+                "tasks_per_user": config.tasks_per_user,
+                "categories": config.categories,
+                "seed": config.seed,
+            },
+            "seed_seconds": round(seed_seconds, 3),
+            "concurrency": concurrency,
+            "duration": duration,
+            "warmup": warmup,
+        },
+        **result,
+    }
@@ -0,0 +1,128 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+from .dataset import WORDS, Dataset, login, make_task
+from .stats import Stats
+
+
+@dataclass
+class VirtualUser:
+    """Один клієнт навантаження: власне з'єднання та сесія одного з тестових користувачів"""
+    client: httpx.AsyncClient
+    admin: httpx.AsyncClient
+    username: str
+    dataset: Dataset
+    rng: random.Random
+    stats: Stats
+    # Завдання, створені цим клієнтом: видаляються лише вони, тож набір даних не змінюється
+    created: List[int] = field(default_factory=list)
+
+    async def request(self, endpoint: str, method: str, url: str, client: Optional[httpx.AsyncClient] = None,
+                      expected: int = 200, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await (client or self.client).request(method, url, **kwargs)
+        self.stats.record(endpoint, started, time.perf_counter() - started, response.status_code == expected)
+        return response
+
+    def own_task(self) -> int:
+        return self.rng.choice(self.dataset.task_ids[self.username])
+
+
+async def login_scenario(vu: VirtualUser) -> None:
+    started = time.perf_counter()
+    try:
+        await login(vu.client, vu.username)
+        ok = True
+    except RuntimeError:
+        ok = False
+    vu.stats.record("POST /auth/login", started, time.perf_counter() - started, ok)
+
+
+async def tasks_page(vu: VirtualUser) -> None:
+    await vu.request("GET /tasks", "GET", "/tasks")
+
+
+async def api_list_tasks(vu: VirtualUser) -> None:
+    await vu.request("GET /api/v1/tasks", "GET", "/api/v1/tasks", params={"limit": 50})
+
+
+async def api_get_task(vu: VirtualUser) -> None:
+    await vu.request("GET /api/v1/tasks/{task_id}", "GET", "/api/v1/tasks/%d" % vu.own_task())
+
+
+async def api_search(vu: VirtualUser) -> None:
+    await vu.request(
+        "GET /api/v1/tasks/search", "GET", "/api/v1/tasks/search",
+        params={"q": vu.rng.choice(WORDS), "limit": 50}
+    )
+
+
+async def api_create_task(vu: VirtualUser) -> None:
+    response = await vu.request(
+        "POST /api/v1/tasks", "POST", "/api/v1/tasks",
+        json=make_task(vu.rng, vu.dataset.category_ids), expected=201
+    )
+    if response.status_code == 201:
+        vu.created.append(response.json()["id"])
+
+
+async def api_update_task(vu: VirtualUser) -> None:
+    await vu.request(
+        "PUT /api/v1/tasks/{task_id}", "PUT", "/api/v1/tasks/%d" % vu.own_task(),
+        json=make_task(vu.rng, vu.dataset.category_ids)
+    )
+
+
+async def api_delete_task(vu: VirtualUser) -> None:
+    if not vu.created:
+        await api_create_task(vu)
+        return
+    task_id = vu.created.pop()
+    await vu.request("DELETE /api/v1/tasks/{task_id}", "DELETE", "/api/v1/tasks/%d" % task_id, expected=204)
+
+
+async def admin_users_page(vu: VirtualUser) -> None:
+    await vu.request("GET /users", "GET", "/users", client=vu.admin)
+
+
+async def admin_categories_page(vu: VirtualUser) -> None:
+    await vu.request("GET /categories", "GET", "/categories", client=vu.admin)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    run: Callable[[VirtualUser], Awaitable[None]]
+    # Шаблон шляху з OpenAPI: сценарій пропускається, якщо застосунок його не має
+    path: str
+    weight: int
+
+
+# Типова суміш запитів: переважно читання, з частиною змін і сторінками адміністратора
+SCENARIOS: Dict[str, Scenario] = {
+    "login": Scenario(login_scenario, "/auth/login", 2),
+    "tasks_page": Scenario(tasks_page, "/tasks", 20),
+    "api_list_tasks": Scenario(api_list_tasks, "/api/v1/tasks", 20),
+    "api_get_task": Scenario(api_get_task, "/api/v1/tasks/{task_id}", 15),
+    "api_search": Scenario(api_search, "/api/v1/tasks/search", 10),
+    "api_create_task": Scenario(api_create_task, "/api/v1/tasks", 8),
+    "api_update_task": Scenario(api_update_task, "/api/v1/tasks/{task_id}", 8),
+    "api_delete_task": Scenario(api_delete_task, "/api/v1/tasks/{task_id}", 7),
+    "admin_users_page": Scenario(admin_users_page, "/users", 5),
+    "admin_categories_page": Scenario(admin_categories_page, "/categories", 5),
+}
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, int]:
+    """Ваги сценаріїв: "tasks_page=10,api_search=0" змінює типові ваги"""
+    mix = {name: scenario.weight for name, scenario in SCENARIOS.items()}
+    if not value:
+        return mix
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError("Unknown scenario: %s (available: %s)" % (name, ", ".join(SCENARIOS)))
+        mix[name] = int(weight)
+    return mix
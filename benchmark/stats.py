@@ -0,0 +1,63 @@
+import statistics
+from collections import defaultdict
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль з лінійною інтерполяцією (як numpy.percentile)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / duration, 2) if duration else 0.0,
+        "mean_ms": round(statistics.fmean(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+class Stats:
+    """
+    Затримки запитів за кінцевими точками. Запити, розпочаті до кінця
+    прогріву (measure_from), не враховуються
+    """
+
+    def __init__(self):
+        self.measure_from = 0.0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.transport_errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, started: float, latency: float, ok: bool) -> None:
+        if started < self.measure_from:
+            return
+        self.latencies[endpoint].append(latency)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def transport_error(self, scenario: str) -> None:
+        self.transport_errors[scenario] += 1
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {
+            name: summarize(self.latencies[name], self.errors[name], duration)
+            for name in sorted(self.latencies)
+        }
+        total = summarize(
+            [value for values in self.latencies.values() for value in values],
+            sum(self.errors.values()),
+            duration
+        )
+        return {"total": total, "endpoints": endpoints, "transport_errors": dict(self.transport_errors)}